@@ -1,6 +1,19 @@
+from bisect import bisect_left, bisect_right
+
+
+def visina(n):
+	return 0 if n is None else n.visina
+
+
+def velicina(n):
+	return 0 if n is None else n.velicina
+
+
 class Node:
 	vr = None
 	left, right, parent = None, None, None
+	visina = 1
+	velicina = 1
 
 	def __init__(self, vrij):
 		self.vr = vrij
@@ -8,33 +21,58 @@ class Node:
 	def setLeftChild(self, a):
 		self.left = a
 		if a is not None: a.parent = self
+		osvjeziVisine(self)
 
 	def setRightChild(self, a):
 		self.right = a
 		if a is not None: a.parent = self
+		osvjeziVisine(self)
 
 	def trazenjeMjesta(self, a):
-		if a<self.vr and self.left is not None:
-			return self.left.trazenjeMjesta(a)
-		elif a>self.vr and self.right is not None:
-			return self.right.trazenjeMjesta(a)
-		else:
-			return self
+		n = self
+		while True:
+			if a < n.vr and n.left is not None:
+				n = n.left
+			elif a > n.vr and n.right is not None:
+				n = n.right
+			else:
+				return n
 
 	def umetanje(self, a):
 		mjestoUmetanja = self.trazenjeMjesta(a)
-		if a < mjestoUmetanja.vr: mjestoUmetanja.setLeftChild(Node(a))
-		elif a > mjestoUmetanja.vr: mjestoUmetanja.setRightChild(Node(a))
-		else: raise Exception("cannot insert")
+		if a == mjestoUmetanja.vr: raise Exception("cannot insert")
+		novi = type(self)(a)
+		novi.parent = mjestoUmetanja
+		if a < mjestoUmetanja.vr: mjestoUmetanja.left = novi
+		else: mjestoUmetanja.right = novi
+		# a new leaf adds one to every size above it and can only raise
+		# heights, so this is cheaper than the setters' full recompute
+		n, h = mjestoUmetanja, 1
+		while n is not None:
+			n.velicina += 1
+			if n.visina <= h:
+				n.visina = h + 1
+			h = n.visina
+			n = n.parent
 		return mjestoUmetanja
 
+	def azurirajVisinu(self):
+		# recomputes the height and the subtree size; True if either changed
+		v = 1 + max(visina(self.left), visina(self.right))
+		s = 1 + velicina(self.left) + velicina(self.right)
+		promjena = v != self.visina or s != self.velicina
+		self.visina, self.velicina = v, s
+		return promjena
+
 	def dubina(self):
-		dubL, dubR = 0, 0
-		if self.left is not None:
-			dubL = self.left.dubina()
-		if self.right is not None:
-			dubR = self.right.dubina()
-		return 1 + max(dubR, dubL)
+		# heights and sizes are kept up to date by setLeftChild and setRightChild
+		return self.visina
+
+
+def osvjeziVisine(n):
+	# recomputes heights and sizes upwards until a node stays the same
+	while n is not None and n.azurirajVisinu():
+		n = n.parent
 
 
 
@@ -43,13 +81,23 @@ class Node:
 
 class SimpleBinarnoStablo:
 	korijen = None
+	Cvor = Node
 
 	def __init__(self, kor = None):
 		self.korijen = kor
 
+	@classmethod
+	def from_sorted(cls, keys):
+		"""Builds a perfectly balanced tree from strictly increasing keys in O(n)."""
+		keys = list(keys)
+		for i in range(1, len(keys)):
+			if not keys[i - 1] < keys[i]:
+				raise ValueError(f'keys are not strictly increasing at {keys[i]!r}')
+		return cls(_izgradiUravnotezeno(keys, 0, len(keys), cls.Cvor))
+
 	def insert(self, a):
 		if self.korijen is None:
-			self.korijen = Node(a)
+			self.korijen = self.Cvor(a)
 			return None
 		else:
 			return self.korijen.umetanje(a)
@@ -65,12 +113,624 @@ class SimpleBinarnoStablo:
 		if self.korijen is None:
 			return True
 		else:
-			dL, dR = 0, 0
-			if self.korijen.left is not None:
-				dL = self.korijen.left.dubina()
-			if self.korijen.right is not None:
-				dR = self.korijen.right.dubina()
-			return abs(dR - dL) < 2
+			return abs(visina(self.korijen.right) - visina(self.korijen.left)) < 2
+
+	def __len__(self):
+		return velicina(self.korijen)
+
+	def _brojManjih(self, x, ukljucivo=False):
+		# number of keys < x, or <= x when ukljucivo
+		n, r = self.korijen, 0
+		while n is not None:
+			if x < n.vr or (x == n.vr and not ukljucivo):
+				n = n.left
+			else:
+				r += 1 + velicina(n.left)
+				n = n.right
+		return r
+
+	def rank(self, x):
+		"""Number of keys smaller than x."""
+		return self._brojManjih(x)
+
+	def select(self, k):
+		"""The k-th smallest key, counting from 0."""
+		if not 0 <= k < len(self):
+			raise IndexError(f'select({k}) on a tree with {len(self)} keys')
+		n = self.korijen
+		while True:
+			l = velicina(n.left)
+			if k < l:
+				n = n.left
+			elif k == l:
+				return n.vr
+			else:
+				k -= l + 1
+				n = n.right
+
+	def count_range(self, lo, hi):
+		"""Number of keys in [lo, hi]."""
+		if hi < lo:
+			return 0
+		return self._brojManjih(hi, True) - self._brojManjih(lo)
+
+	def iter_range(self, lo, hi):
+		"""Lazily yields the keys in [lo, hi] in ascending order."""
+		stack = []
+		n = self.korijen
+		while n is not None:
+			if n.vr >= lo:
+				stack.append(n)
+				n = n.left
+			else:
+				n = n.right
+		while stack:
+			n = stack.pop()
+			if n.vr > hi:
+				return
+			yield n.vr
+			n = n.right
+			while n is not None:
+				stack.append(n)
+				n = n.left
+
+
+def _izgradiUravnotezeno(keys, lo, hi, Cvor, dubina=0):
+	# middle key at the root, so all leaves are at most one level apart
+	if lo >= hi:
+		return None
+	sredina = (lo + hi) // 2
+	n = Cvor(keys[sredina])
+	n.setLeftChild(_izgradiUravnotezeno(keys, lo, sredina, Cvor, dubina + 1))
+	n.setRightChild(_izgradiUravnotezeno(keys, sredina + 1, hi, Cvor, dubina + 1))
+	if Cvor is RBNode:
+		# only the deepest level is red, which keeps black heights equal
+		n.crven = dubina > 0 and dubina == (len(keys)).bit_length() - 1
+	return n
+
+
+class UravnotezenoStablo(SimpleBinarnoStablo):
+	# rotations shared by the self-balancing trees
+
+	def _zamijeni(self, p, stari, novi):
+		if p is None:
+			self.korijen = novi
+			novi.parent = None
+		elif p.left is stari:
+			p.setLeftChild(novi)
+		else:
+			p.setRightChild(novi)
+
+	def _rotirajLijevo(self, x):
+		y, p = x.right, x.parent
+		# detached first, so the setters refresh x and y and then p upwards
+		x.parent = y.parent = None
+		x.setRightChild(y.left)
+		y.setLeftChild(x)
+		self._zamijeni(p, x, y)
+		return y
+
+	def _rotirajDesno(self, x):
+		y, p = x.left, x.parent
+		x.parent = y.parent = None
+		x.setLeftChild(y.right)
+		y.setRightChild(x)
+		self._zamijeni(p, x, y)
+		return y
+
+
+class AVLStablo(UravnotezenoStablo):
+	"""AVL tree: sibling subtree heights differ by at most one.
+
+	Same insert/trazi API as SimpleBinarnoStablo; every operation is
+	O(log n) in the worst case, so jelBalansirano is always True.
+	"""
+
+	def insert(self, a):
+		mjestoUmetanja = super().insert(a)
+		n = mjestoUmetanja
+		while n is not None:
+			ravnoteza = visina(n.left) - visina(n.right)
+			if ravnoteza > 1:
+				if visina(n.left.left) < visina(n.left.right):
+					self._rotirajLijevo(n.left)
+				n = self._rotirajDesno(n)
+			elif ravnoteza < -1:
+				if visina(n.right.right) < visina(n.right.left):
+					self._rotirajDesno(n.right)
+				n = self._rotirajLijevo(n)
+			n = n.parent
+		return mjestoUmetanja
+
+	def _isprazni(self):
+		n, self.korijen = self.korijen, None
+		return n
+
+	def _kopija(self):
+		# balanced O(n) copy, so the set operations leave self intact
+		kljucevi = _kljucevi(self.korijen)
+		return AVLStablo(_izgradiUravnotezeno(kljucevi, 0, len(kljucevi), self.Cvor))
+
+	def split(self, key):
+		"""Returns (keys < key, key in tree, keys > key) as new trees.
+
+		self is unchanged; this copies it first, so it is O(n).
+		split_destructive does the O(log n) split by reusing the nodes.
+		"""
+		return split_destructive(self._kopija(), key)
+
+	def union(self, other, workers=None):
+		"""New tree with the keys of both trees; self and other are unchanged.
+
+		Copies both inputs, O(n + m). union_destructive skips the copies.
+		"""
+		return _skupovna('union', self, other, workers, kopiraj=True)
+
+	def intersection(self, other, workers=None):
+		return _skupovna('intersection', self, other, workers, kopiraj=True)
+
+	def difference(self, other, workers=None):
+		return _skupovna('difference', self, other, workers, kopiraj=True)
+
+
+def split_destructive(tree, key):
+	"""split() in O(log n) that reuses the nodes of tree and leaves it empty."""
+	_provjeriAVL(tree)
+	l, nadjen, r = _podijeli(tree._isprazni(), key)
+	return AVLStablo(l), nadjen is not None, AVLStablo(r)
+
+
+def union_destructive(a, b, workers=None):
+	"""Union of two AVLStablo trees built from their nodes; empties a and b."""
+	return _skupovna('union', a, b, workers)
+
+
+def intersection_destructive(a, b, workers=None):
+	return _skupovna('intersection', a, b, workers)
+
+
+def difference_destructive(a, b, workers=None):
+	return _skupovna('difference', a, b, workers)
+
+
+def _provjeriAVL(*stabla):
+	# the joins rely on AVL heights; other trees could be arbitrarily deep
+	for t in stabla:
+		if not isinstance(t, AVLStablo):
+			raise TypeError(f'expected AVLStablo, got {type(t).__name__}')
+
+
+def _skupovna(op, a, b, workers, kopiraj=False):
+	"""Join-based set operation (Blelloch, Ferizovic, Sun).
+
+	Runs in O(m log(n/m + 1)) for sizes m <= n by reusing the nodes of both
+	trees, which are left empty unless kopiraj asks to work on copies. With
+	workers, inputs of at least PARALELNI_PRAG keys are cut into
+	independent subproblems a few levels down, and those run on a process
+	pool.
+	"""
+	_provjeriAVL(a, b)
+	if kopiraj:
+		a, b = a._kopija(), b._kopija()
+	if workers and len(a) + len(b) >= PARALELNI_PRAG:
+		dubina = max(1, (workers - 1).bit_length() + 1)
+		return AVLStablo(_skupovnaParalelno(op, a._isprazni(), b._isprazni(),
+											workers, dubina))
+	return AVLStablo(_skupovnaOp(op, a._isprazni(), b._isprazni()))
+
+
+PARALELNI_PRAG = 200000
+
+
+def _cvor(l, n, r):
+	n.parent = None
+	n.setLeftChild(l)
+	n.setRightChild(r)
+	return n
+
+
+def _razotkrij(n):
+	# detaches n from its children; n is then reused as a join key
+	l, r = n.left, n.right
+	if l is not None:
+		l.parent = None
+	if r is not None:
+		r.parent = None
+	n.left = n.right = None
+	return l, n, r
+
+
+def _rotirajLijevo(x):
+	y = x.right
+	return _cvor(_cvor(x.left, x, y.left), y, y.right)
+
+
+def _rotirajDesno(x):
+	y = x.left
+	return _cvor(y.left, y, _cvor(y.right, x, x.right))
+
+
+def _spojiDesno(tl, k, tr):
+	l, kl, c = _razotkrij(tl)
+	if visina(c) <= visina(tr) + 1:
+		t = _cvor(c, k, tr)
+		if visina(t) <= visina(l) + 1:
+			return _cvor(l, kl, t)
+		return _rotirajLijevo(_cvor(l, kl, _rotirajDesno(t)))
+	t = _spojiDesno(c, k, tr)
+	if visina(t) <= visina(l) + 1:
+		return _cvor(l, kl, t)
+	return _rotirajLijevo(_cvor(l, kl, t))
+
+
+def _spojiLijevo(tl, k, tr):
+	c, kr, r = _razotkrij(tr)
+	if visina(c) <= visina(tl) + 1:
+		t = _cvor(tl, k, c)
+		if visina(t) <= visina(r) + 1:
+			return _cvor(t, kr, r)
+		return _rotirajDesno(_cvor(_rotirajLijevo(t), kr, r))
+	t = _spojiLijevo(tl, k, c)
+	if visina(t) <= visina(r) + 1:
+		return _cvor(t, kr, r)
+	return _rotirajDesno(_cvor(t, kr, r))
+
+
+def _spoji(tl, k, tr):
+	# AVL join: every key of tl < k.vr < every key of tr
+	if visina(tl) > visina(tr) + 1:
+		return _spojiDesno(tl, k, tr)
+	if visina(tr) > visina(tl) + 1:
+		return _spojiLijevo(tl, k, tr)
+	return _cvor(tl, k, tr)
+
+
+def _odvojiZadnji(t):
+	l, k, r = _razotkrij(t)
+	if r is None:
+		return l, k
+	r, zadnji = _odvojiZadnji(r)
+	return _spoji(l, k, r), zadnji
+
+
+def _spoji2(tl, tr):
+	if tl is None:
+		return tr
+	tl, k = _odvojiZadnji(tl)
+	return _spoji(tl, k, tr)
+
+
+def _podijeli(t, key):
+	# returns (keys < key, node holding key or None, keys > key)
+	if t is None:
+		return None, None, None
+	l, k, r = _razotkrij(t)
+	if key == k.vr:
+		return l, k, r
+	if key < k.vr:
+		ll, nadjen, lr = _podijeli(l, key)
+		return ll, nadjen, _spoji(lr, k, r)
+	rl, nadjen, rr = _podijeli(r, key)
+	return _spoji(l, k, rl), nadjen, rr
+
+
+def _kombiniraj(op, l, k, nadjen, r):
+	if op == 'union' or (op == 'intersection' and nadjen is not None):
+		return _spoji(l, k, r)
+	return _spoji2(l, r)
+
+
+def _skupovnaOp(op, t1, t2):
+	if t1 is None or t2 is None:
+		if op == 'union':
+			return t2 if t1 is None else t1
+		return t1 if op == 'difference' else None
+	l2, k2, r2 = _razotkrij(t2)
+	l1, nadjen, r1 = _podijeli(t1, k2.vr)
+	return _kombiniraj(op, _skupovnaOp(op, l1, l2), k2, nadjen, _skupovnaOp(op, r1, r2))
+
+
+def _kljucevi(t):
+	# in-order keys of a subtree
+	kljucevi, stack = [], []
+	while stack or t is not None:
+		while t is not None:
+			stack.append(t)
+			t = t.left
+		t = stack.pop()
+		kljucevi.append(t.vr)
+		t = t.right
+	return kljucevi
+
+
+def _skupovnaUProcesu(op, kljucevi1, kljucevi2):
+	t1 = _izgradiUravnotezeno(kljucevi1, 0, len(kljucevi1), Node)
+	t2 = _izgradiUravnotezeno(kljucevi2, 0, len(kljucevi2), Node)
+	return _kljucevi(_skupovnaOp(op, t1, t2))
+
+
+def _rastavi(op, t1, t2, dubina, zadaci):
+	# splits the problem dubina levels down; leaves become pool tasks
+	if dubina == 0 or t1 is None or t2 is None:
+		zadaci.append((t1, t2))
+		return len(zadaci) - 1
+	l2, k2, r2 = _razotkrij(t2)
+	l1, nadjen, r1 = _podijeli(t1, k2.vr)
+	return (_rastavi(op, l1, l2, dubina - 1, zadaci), k2, nadjen,
+			_rastavi(op, r1, r2, dubina - 1, zadaci))
+
+
+def _sastavi(op, plan, rezultati):
+	if isinstance(plan, int):
+		return rezultati[plan]
+	l, k, nadjen, r = plan
+	return _kombiniraj(op, _sastavi(op, l, rezultati), k, nadjen,
+					   _sastavi(op, r, rezultati))
+
+
+def _skupovnaParalelno(op, t1, t2, workers, dubina):
+	from concurrent.futures import ProcessPoolExecutor
+
+	zadaci = []
+	plan = _rastavi(op, t1, t2, dubina, zadaci)
+	# subtrees travel as sorted key lists and are rebuilt in O(n) on both ends
+	with ProcessPoolExecutor(workers) as pool:
+		futures = [pool.submit(_skupovnaUProcesu, op, _kljucevi(a), _kljucevi(b))
+				   for a, b in zadaci]
+		rezultati = []
+		for f in futures:
+			kljucevi = f.result()
+			rezultati.append(_izgradiUravnotezeno(kljucevi, 0, len(kljucevi), Node))
+	return _sastavi(op, plan, rezultati)
+
+
+class RBNode(Node):
+	crven = True
+
+
+class CrvenoCrnoStablo(UravnotezenoStablo):
+	"""Red-black tree with the same insert/trazi API as SimpleBinarnoStablo.
+
+	The height stays below 2 log2(n + 1). Heights are maintained as well, so
+	jelBalansirano is O(1), though a red-black tree may legitimately
+	answer False.
+	"""
+	Cvor = RBNode
+
+	def insert(self, a):
+		if self.korijen is None:
+			self.korijen = RBNode(a)
+			self.korijen.crven = False
+			return None
+		mjestoUmetanja = self.korijen.umetanje(a)
+		z = mjestoUmetanja.left if a < mjestoUmetanja.vr else mjestoUmetanja.right
+		while z.parent is not None and z.parent.crven:
+			p = z.parent
+			g = p.parent
+			if p is g.left:
+				u = g.right
+				if u is not None and u.crven:
+					p.crven = u.crven = False
+					g.crven = True
+					z = g
+					continue
+				if z is p.right:
+					z = p
+					p = self._rotirajLijevo(p)
+				p.crven = False
+				g.crven = True
+				self._rotirajDesno(g)
+			else:
+				u = g.left
+				if u is not None and u.crven:
+					p.crven = u.crven = False
+					g.crven = True
+					z = g
+					continue
+				if z is p.left:
+					z = p
+					p = self._rotirajDesno(p)
+				p.crven = False
+				g.crven = True
+				self._rotirajLijevo(g)
+		self.korijen.crven = False
+		return mjestoUmetanja
+
+
+class BNode:
+	__slots__ = ('keys', 'children')
+
+	def __init__(self, keys, children=None):
+		self.keys = keys
+		# None for leaves; internal nodes have len(keys) + 1 children
+		self.children = children
+
+
+class BTreeIndex:
+	"""B+ tree index with the same insert/trazi API as SimpleBinarnoStablo.
+
+	Every node holds up to fanout keys in a plain sorted list searched
+	with bisect, and all keys live in the leaves, so a lookup touches
+	O(log_fanout n) small contiguous lists instead of one Node per level.
+	trazi returns the key itself, or None.
+	"""
+
+	def __init__(self, fanout=64):
+		if fanout < 3:
+			raise ValueError('fanout must be at least 3')
+		self.fanout = fanout
+		self.korijen = BNode([])
+		self.n = 0
+
+	def __len__(self):
+		return self.n
+
+	@classmethod
+	def from_sorted(cls, keys, fanout=64):
+		"""Builds the index bottom-up from strictly increasing keys in O(n)."""
+		stablo = cls(fanout)
+		keys = list(keys)
+		for i in range(1, len(keys)):
+			if not keys[i - 1] < keys[i]:
+				raise ValueError(f'keys are not strictly increasing at {keys[i]!r}')
+		if not keys:
+			return stablo
+		# nodes are filled to 3/4 so the first inserts do not split them all
+		puno = max(2, fanout * 3 // 4)
+		razina = [BNode(keys[i:i + puno]) for i in range(0, len(keys), puno)]
+		minimumi = [cvor.keys[0] for cvor in razina]
+		while len(razina) > 1:
+			iduca, iduciMinimumi = [], []
+			for i in range(0, len(razina), puno + 1):
+				djeca = razina[i:i + puno + 1]
+				iduca.append(BNode(minimumi[i + 1:i + len(djeca)], djeca))
+				iduciMinimumi.append(minimumi[i])
+			razina, minimumi = iduca, iduciMinimumi
+		stablo.korijen = razina[0]
+		stablo.n = len(keys)
+		return stablo
+
+	def trazi(self, a):
+		n = self.korijen
+		while n.children is not None:
+			n = n.children[bisect_right(n.keys, a)]
+		i = bisect_left(n.keys, a)
+		if i < len(n.keys) and n.keys[i] == a:
+			return n.keys[i]
+		return None
+
+	def insert(self, a):
+		n, put = self.korijen, []
+		while n.children is not None:
+			i = bisect_right(n.keys, a)
+			put.append((n, i))
+			n = n.children[i]
+		i = bisect_left(n.keys, a)
+		if i < len(n.keys) and n.keys[i] == a:
+			raise Exception("cannot insert")
+		n.keys.insert(i, a)
+		self.n += 1
+
+		# split overfull nodes bottom-up
+		while len(n.keys) > self.fanout:
+			sredina = len(n.keys) // 2
+			if n.children is None:
+				desni = BNode(n.keys[sredina:])
+				separator = desni.keys[0]
+				del n.keys[sredina:]
+			else:
+				desni = BNode(n.keys[sredina + 1:], n.children[sredina + 1:])
+				separator = n.keys[sredina]
+				del n.keys[sredina:]
+				del n.children[sredina + 1:]
+			if put:
+				roditelj, i = put.pop()
+				roditelj.keys.insert(i, separator)
+				roditelj.children.insert(i + 1, desni)
+				n = roditelj
+			else:
+				self.korijen = BNode([separator], [n, desni])
+				break
+		return None
+
+	def __iter__(self):
+		stack = [self.korijen]
+		while stack:
+			n = stack.pop()
+			if n.children is None:
+				yield from n.keys
+			else:
+				stack.extend(reversed(n.children))
+
+
+def usporedbaIndeksa(n=1000000, fanout=64):
+	import random
+	import time
+	import tracemalloc
+
+	kljucevi = list(range(n))
+	random.Random(0).shuffle(kljucevi)
+	upiti = kljucevi[::10]
+	for ime, izgradi in (('SimpleBinarnoStablo', SimpleBinarnoStablo),
+						 ('BTreeIndex', lambda: BTreeIndex(fanout))):
+		tracemalloc.start()
+		b = izgradi()
+		for k in kljucevi:
+			b.insert(k)
+		memorija = tracemalloc.get_traced_memory()[0]
+		tracemalloc.stop()
+		del b
+		b = izgradi()
+		start = time.perf_counter()
+		for k in kljucevi:
+			b.insert(k)
+		t_insert = time.perf_counter() - start
+		start = time.perf_counter()
+		for k in upiti:
+			b.trazi(k)
+		t_trazi = time.perf_counter() - start
+		print(f'{ime}: {memorija / n:.0f} bytes/key, {n / t_insert / 1e3:.0f}k inserts/s, '
+			  f'{len(upiti) / t_trazi / 1e3:.0f}k lookups/s')
+		del b
+	start = time.perf_counter()
+	BTreeIndex.from_sorted(range(n), fanout)
+	print(f'BTreeIndex.from_sorted: {n / (time.perf_counter() - start) / 1e3:.0f}k keys/s')
+
+
+def usporedbaSkupova(n=1000000, m=1000, workers=4):
+	import random
+	import time
+
+	rnd = random.Random(0)
+	veliki = sorted(rnd.sample(range(4 * n), n))
+	start = time.perf_counter()
+	AVLStablo.from_sorted(veliki)
+	print(f'from_sorted {n} keys: {time.perf_counter() - start:.2f}s')
+	for velicinaM in (m, n):
+		mali = sorted(rnd.sample(range(4 * n), velicinaM))
+		for op in (union_destructive, intersection_destructive, difference_destructive):
+			a, b = AVLStablo.from_sorted(veliki), AVLStablo.from_sorted(mali)
+			start = time.perf_counter()
+			op(a, b)
+			print(f'{op.__name__} of {n} and {velicinaM} keys: '
+				  f'{time.perf_counter() - start:.2f}s')
+		a, b = AVLStablo.from_sorted(veliki), AVLStablo.from_sorted(mali)
+		start = time.perf_counter()
+		a.union(b)
+		print(f'union (copying) of {n} and {velicinaM} keys: '
+			  f'{time.perf_counter() - start:.2f}s')
+		# what merging costs without join: one insert per key
+		a = AVLStablo.from_sorted(veliki)
+		start = time.perf_counter()
+		for k in mali:
+			if a.trazi(k) is None:
+				a.insert(k)
+		print(f'union by inserting {velicinaM} keys: {time.perf_counter() - start:.2f}s')
+	a, b = AVLStablo.from_sorted(veliki), AVLStablo.from_sorted(mali)
+	start = time.perf_counter()
+	union_destructive(a, b, workers=workers)
+	print(f'union of {n} and {n} keys with {workers} workers: '
+		  f'{time.perf_counter() - start:.2f}s')
+
+
+def usporedbaUmetanja(n=100000, nSortirano=5000):
+	import random
+	import time
+
+	kljucevi = list(range(n))
+	random.Random(0).shuffle(kljucevi)
+	for ime, stablo in (('SimpleBinarnoStablo', SimpleBinarnoStablo),
+						('AVLStablo', AVLStablo), ('CrvenoCrnoStablo', CrvenoCrnoStablo)):
+		# the plain tree degrades to a list on sorted input, so it gets fewer keys
+		for opis, ulaz in (('random', kljucevi),
+						   ('sorted', range(nSortirano if stablo is SimpleBinarnoStablo else n))):
+			b = stablo()
+			start = time.perf_counter()
+			for k in ulaz:
+				b.insert(k)
+			t = time.perf_counter() - start
+			print(f'{ime} {opis} {len(ulaz)}: {len(ulaz) / t / 1e3:.0f}k inserts/s, '
+				  f'height {visina(b.korijen)}')
 
 
 def main():
@@ -84,4 +744,9 @@ def main():
 		print("pronaden je cvor vrijednosti 5")
 
 
-main()
\ No newline at end of file
+main()
+
+if __name__ == '__main__':
+	usporedbaUmetanja()
+	usporedbaIndeksa()
+	usporedbaSkupova()
@@ -1,3 +1,13 @@
+import heapq
+import mmap
+import struct
+import threading
+from array import array
+from bisect import bisect_left, insort
+from itertools import islice
+from operator import lt
+
+
 class TrieNode:
     def __init__(self, value: str) -> None:
         self.value = value
@@ -10,17 +20,30 @@ class Trie:
 
 
 class Node:
+	# class defaults, so nodes of a trie without weights or a top_k cache
+	# cost no more than before
+	weight = 0
+	top = ()
+	is_word = False
+
 	def __init__(self, c):
 		self.c = c
-		self.is_word = False
 		self.children = {}
 
 
 class Trie:
-	def __init__(self):
+	def __init__(self, top_size=0):
+		"""top_size > 0 makes every node cache its top_size best completions
+		(as sorted (-weight, word)) for top_k, at a cost on every insert."""
 		self.root = Node('\0')
+		self.top_size = top_size
+		if top_size:
+			self.root.top = []
 
-	def insert(self, word):
+	def insert(self, word, weight=0):
+		if self.top_size:
+			self._insert_cached(word, weight)
+			return
 		curr = self.root
 		for char in word:
 			if char not in curr.children:
@@ -28,15 +51,200 @@ class Trie:
 			curr = curr.children[char]
 
 		curr.is_word = True
+		if curr.weight != weight:
+			curr.weight = weight
+
+	def _insert_cached(self, word, weight):
+		curr = self.root
+		path = [curr]
+		for char in word:
+			if char not in curr.children:
+				curr.children[char] = Node(char)
+				curr.children[char].top = []
+			curr = curr.children[char]
+			path.append(curr)
+
+		old = curr.weight if curr.is_word else None
+		curr.is_word = True
+		curr.weight = weight
+		self._update_top(path, word, old, weight)
+
+	def _update_top(self, path, word, old, weight):
+		# every node on the path caches its top_size best completions
+		entry = (-weight, word)
+		for depth in range(len(path) - 1, -1, -1):
+			node = path[depth]
+			top = node.top
+			cached = old is not None and (-old, word) in top
+			if cached:
+				top.remove((-old, word))
+			if cached and weight < old:
+				# a completion that was cut off may now belong in the cache
+				candidates = [c for child in node.children.values() for c in child.top]
+				if node.is_word:
+					candidates.append((-node.weight, word[:depth]))
+				node.top = heapq.nsmallest(self.top_size, candidates)
+			else:
+				insort(top, entry)
+				del top[self.top_size:]
+
+	@classmethod
+	def from_sorted(cls, words, top_size=0):
+		"""Builds a trie from sorted words, all with weight 0.
+
+		The words below a node are a contiguous slice of the sorted list,
+		so every node is built once from its slice: one bisect per child
+		finds where the child's slice ends, and a slice of one word is
+		built as a plain chain. Sorted input also means a node's best top_k
+		completions are the first top_size words of its slice.
+		"""
+		uniq = list(words)
+		if not all(map(lt, uniq, islice(uniq, 1, None))):
+			for prev, word in zip(uniq, islice(uniq, 1, None)):
+				if word < prev:
+					raise ValueError(f'words are not sorted: {word!r} after {prev!r}')
+			uniq = list(dict.fromkeys(uniq))
+		trie = cls(top_size)
+		if not uniq:
+			return trie
+		# cache entries are immutable, so all the caches share one tuple per word
+		entries = [(0, w) for w in uniq] if top_size else None
+		stack = [(trie.root, 0, len(uniq), 0)]
+		while stack:
+			node, lo, hi, depth = stack.pop()
+			if top_size:
+				node.top = entries[lo:min(hi, lo + top_size)]
+			if len(uniq[lo]) == depth:
+				node.is_word = True
+				lo += 1
+			children = node.children
+			while lo < hi:
+				word = uniq[lo]
+				c = word[depth]
+				if lo + 1 == hi or uniq[lo + 1][depth] != c:
+					# the only word below this child: build its chain
+					curr = children[c] = Node(c)
+					if top_size:
+						entry = entries[lo]
+						curr.top = [entry]
+						for char in word[depth + 1:]:
+							curr.children[char] = curr = Node(char)
+							curr.top = [entry]
+					else:
+						for char in word[depth + 1:]:
+							curr.children[char] = curr = Node(char)
+					curr.is_word = True
+					lo += 1
+					continue
+				if c == '\U0010ffff':
+					end = hi
+				else:
+					end = bisect_left(uniq, word[:depth] + chr(ord(c) + 1), lo + 2, hi)
+				child = children[c] = Node(c)
+				stack.append((child, lo, end, depth + 1))
+				lo = end
+		return trie
 
 	def search(self, word):
 		node = self.getNode(word)
 		return node is not None and node.is_word
 
+	def save(self, path):
+		"""Saves the words as a FrozenTrie file; weights are not kept."""
+		FrozenTrie.from_sorted(self.iter_prefix('')).save(path)
+
+	@staticmethod
+	def load_mmap(path):
+		return FrozenTrie.load_mmap(path)
+
 	def startsWith(self, prefix):
 		node = self.getNode(prefix)
 		return node is not None;
 
+	def _nodes_many(self, words):
+		# visit the words in sorted order; a word that extends the last one
+		# found resumes from its node instead of walking from the root
+		result = [None] * len(words)
+		root = self.root
+		walked, deepest = '', root
+		for i in sorted(range(len(words)), key=words.__getitem__):
+			word = words[i]
+			if word.startswith(walked):
+				node, rest = deepest, word[len(walked):]
+			else:
+				node, rest = root, word
+			for char in rest:
+				node = node.children.get(char)
+				if node is None:
+					break
+			else:
+				walked, deepest = word, node
+			result[i] = node
+		return result
+
+	def search_many(self, words):
+		return [n is not None and n.is_word for n in self._nodes_many(list(words))]
+
+	def starts_with_many(self, prefixes):
+		return [n is not None for n in self._nodes_many(list(prefixes))]
+
+	def iter_prefix(self, prefix):
+		"""Lazily yields the stored words starting with prefix, in order."""
+		for word, _ in self._iter_words(prefix):
+			yield word
+
+	def _iter_words(self, prefix):
+		node = self.getNode(prefix)
+		if node is None:
+			return
+		stack = [(node, prefix)]
+		while stack:
+			node, word = stack.pop()
+			if node.is_word:
+				yield word, node
+			for char in sorted(node.children, reverse=True):
+				stack.append((node.children[char], word + char))
+
+	def top_k(self, prefix, k):
+		"""Returns up to k words starting with prefix, heaviest first.
+
+		Ties are broken alphabetically. Answered from the per-node cache in
+		O(len(prefix) + k) when k <= top_size.
+		"""
+		node = self.getNode(prefix)
+		if node is None:
+			return []
+		if k <= self.top_size:
+			return [word for _, word in node.top[:k]]
+		best = heapq.nsmallest(k, ((-n.weight, w) for w, n in self._iter_words(prefix)))
+		return [word for _, word in best]
+
+	def search_fuzzy(self, word, max_dist):
+		"""Returns (stored word, edit distance) pairs within max_dist of word.
+
+		Walks the trie carrying one Levenshtein DP row per node, so shared
+		prefixes are computed once, and skips every subtree whose row
+		minimum already exceeds max_dist. Sorted by distance, then word.
+		"""
+		found = []
+		first = list(range(len(word) + 1))
+		if self.root.is_word and first[-1] <= max_dist:
+			found.append((first[-1], ''))
+		stack = [(self.root, '', first)]
+		while stack:
+			node, prefix, prev = stack.pop()
+			for char, child in node.children.items():
+				row = [prev[0] + 1]
+				for j in range(1, len(prev)):
+					row.append(min(row[j - 1] + 1, prev[j] + 1,
+								   prev[j - 1] + (word[j - 1] != char)))
+				if child.is_word and row[-1] <= max_dist:
+					found.append((row[-1], prefix + char))
+				if min(row) <= max_dist:
+					stack.append((child, prefix + char, row))
+		found.sort()
+		return [(w, d) for d, w in found]
+
 	def getNode(self, word):
 		curr = self.root
 		for char in word:
@@ -47,6 +255,533 @@ class Trie:
 		return curr
 
 
+def _common_prefix(a, b):
+	n = min(len(a), len(b))
+	i = 0
+	while i < n and a[i] == b[i]:
+		i += 1
+	return i
+
+
+class RadixNode:
+	__slots__ = ('label', 'is_word', 'children')
+
+	def __init__(self, label, is_word=False):
+		self.label = label
+		self.is_word = is_word
+		self.children = {}
+
+
+class CompactTrie:
+	"""Trie with path compression (radix tree).
+
+	Chains of single-child nodes are merged into one node whose label holds
+	the whole substring, and children are keyed by the first character of
+	their label. freeze() turns it into a read-only minimized DAWG.
+	"""
+
+	def __init__(self):
+		self.root = RadixNode('')
+
+	def insert(self, word):
+		node, i = self.root, 0
+		while i < len(word):
+			child = node.children.get(word[i])
+			if child is None:
+				node.children[word[i]] = RadixNode(word[i:], True)
+				return
+			label = child.label
+			if not word.startswith(label, i):
+				# split the edge where word and label diverge
+				l = 1
+				while i + l < len(word) and word[i + l] == label[l]:
+					l += 1
+				mid = RadixNode(label[:l])
+				child.label = label[l:]
+				mid.children[child.label[0]] = child
+				node.children[word[i]] = mid
+				child = mid
+			node, i = child, i + len(child.label)
+		node.is_word = True
+
+	def search(self, word):
+		node, i = self.root, 0
+		while i < len(word):
+			node = node.children.get(word[i])
+			if node is None or not word.startswith(node.label, i):
+				return False
+			i += len(node.label)
+		return node.is_word
+
+	def startsWith(self, prefix):
+		node, i = self.root, 0
+		while i < len(prefix):
+			node = node.children.get(prefix[i])
+			if node is None:
+				return False
+			if len(prefix) - i <= len(node.label):
+				return node.label.startswith(prefix[i:])
+			if not prefix.startswith(node.label, i):
+				return False
+			i += len(node.label)
+		return True
+
+	def freeze(self):
+		return FrozenTrie(self)
+
+
+_TRIE_MAGIC = b'DAWG\x00\x00\x00\x00'
+_TRIE_VERSION = 1
+_TRIE_HEADER = '=8sIIqQQ'
+
+
+class FrozenTrie:
+	"""Read-only minimized DAWG over the words of a CompactTrie.
+
+	Equal suffix structures are merged into one state. State s owns the
+	edges offsets[s]:offsets[s + 1] of the flat arrays labels (character
+	codes, sorted) and targets, and final[s] marks states ending a word.
+	A step is one bisect over the state's edge slice.
+	"""
+
+	def __init__(self, trie=None):
+		self.offsets = array('q', [0])
+		self.labels = array('i')
+		self.targets = array('q')
+		self.final = bytearray()
+		self.root = -1
+		self._registry = {}
+		if trie is not None:
+			self._build(trie)
+		self._registry = None
+
+	def _register(self, is_word, edges):
+		key = (is_word, tuple(edges))
+		state = self._registry.get(key)
+		if state is None:
+			state = self._registry[key] = len(self.final)
+			for c, target in edges:
+				self.labels.append(c)
+				self.targets.append(target)
+			self.offsets.append(len(self.labels))
+			self.final.append(is_word)
+		return state
+
+	def _build(self, trie):
+		# iterative postorder over the radix tree; each label is expanded
+		# into a chain of single-edge states ending at the child's state
+		states = {}
+		stack = [(trie.root, False)]
+		while stack:
+			node, done = stack.pop()
+			if not done:
+				stack.append((node, True))
+				stack.extend((child, False) for child in node.children.values())
+				continue
+			edges = []
+			for c in sorted(node.children):
+				child = node.children[c]
+				target = states.pop(id(child))
+				for ch in reversed(child.label[1:]):
+					target = self._register(False, [(ord(ch), target)])
+				edges.append((ord(c), target))
+			states[id(node)] = self._register(node.is_word, edges)
+		self.root = states[id(trie.root)]
+
+	@classmethod
+	def from_sorted(cls, words):
+		"""Builds the minimal DAWG incrementally from sorted words.
+
+		Only the path of the last word is kept unfinished; when the next
+		word leaves it, the states below the divergence point can no longer
+		change and are merged into the registry (Daciuk et al.).
+		"""
+		frozen = cls()
+		frozen._registry = {}
+		pending = [[False, [], None]]  # [is_word, edges, incoming char]
+		prev = None
+		for word in words:
+			if prev is not None and word <= prev:
+				if word == prev:
+					continue
+				raise ValueError(f'words are not sorted: {word!r} after {prev!r}')
+			d = _common_prefix(prev or '', word)
+			frozen._finish(pending, d)
+			for char in word[d:]:
+				pending.append([False, [], char])
+			pending[-1][0] = True
+			prev = word
+		frozen._finish(pending, 0)
+		frozen.root = frozen._register(pending[0][0], pending[0][1])
+		frozen._registry = None
+		return frozen
+
+	def _finish(self, pending, depth):
+		while len(pending) > depth + 1:
+			is_word, edges, char = pending.pop()
+			pending[-1][1].append((ord(char), self._register(is_word, edges)))
+
+	def __len__(self):
+		return len(self.final)
+
+	def insert(self, word):
+		raise TypeError('a frozen trie cannot be modified')
+
+	def getState(self, word):
+		labels, offsets, targets = self.labels, self.offsets, self.targets
+		s = self.root
+		for char in word:
+			c = ord(char)
+			lo, hi = offsets[s], offsets[s + 1]
+			j = bisect_left(labels, c, lo, hi)
+			if j == hi or labels[j] != c:
+				return -1
+			s = targets[j]
+		return s
+
+	def search(self, word):
+		s = self.getState(word)
+		return s != -1 and bool(self.final[s])
+
+	def startsWith(self, prefix):
+		return self.getState(prefix) != -1
+
+	def iter_prefix(self, prefix):
+		"""Lazily yields the stored words starting with prefix, in order."""
+		s = self.getState(prefix)
+		if s == -1:
+			return
+		labels, offsets, targets = self.labels, self.offsets, self.targets
+		stack = [(s, prefix)]
+		while stack:
+			s, word = stack.pop()
+			if self.final[s]:
+				yield word
+			for j in range(offsets[s + 1] - 1, offsets[s] - 1, -1):
+				stack.append((targets[j], word + chr(labels[j])))
+
+	def save(self, path):
+		"""Writes the DAWG in the binary format read by load_mmap.
+
+		A header (magic, format version, root, number of states and edges)
+		is followed by the raw arrays in native byte order: offsets and
+		targets as int64, labels as int32, final as bytes.
+		"""
+		with open(path, 'wb') as f:
+			f.write(struct.pack(_TRIE_HEADER, _TRIE_MAGIC, _TRIE_VERSION, 0,
+								self.root, len(self.final), len(self.labels)))
+			for col in (self.offsets, self.targets, self.labels, self.final):
+				f.write(col)
+
+	@classmethod
+	def load_mmap(cls, path):
+		"""Opens a file written by save without reading it into memory.
+
+		The arrays become memoryviews over a read-only mmap of the file, so
+		loading takes constant time and every process that maps the file
+		shares one copy in the page cache.
+		"""
+		with open(path, 'rb') as f:
+			buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+		header = struct.calcsize(_TRIE_HEADER)
+		if len(buf) < header or buf[:len(_TRIE_MAGIC)] != _TRIE_MAGIC:
+			raise ValueError(f'{path} is not a trie file')
+		_, version, _, root, states, edges = struct.unpack_from(_TRIE_HEADER, buf)
+		if version != _TRIE_VERSION:
+			raise ValueError(f'{path} has unsupported format version {version}')
+		if len(buf) != header + 8 * (states + 1) + 12 * edges + states:
+			raise ValueError(f'{path} is truncated')
+		view = memoryview(buf)
+		frozen = cls()
+		pos = header
+		for name, fmt, count in (('offsets', 'q', states + 1), ('targets', 'q', edges),
+								 ('labels', 'i', edges), ('final', 'B', states)):
+			size = struct.calcsize(fmt) * count
+			setattr(frozen, name, view[pos:pos + size].cast(fmt))
+			pos += size
+		frozen.root = root
+		frozen._mmap = buf
+		return frozen
+
+
+class _PersistentNode:
+	__slots__ = ('is_word', 'children')
+
+	def __init__(self, is_word=False, children=None):
+		self.is_word = is_word
+		self.children = children if children is not None else {}
+
+
+class TrieSnapshot:
+	"""Immutable view of a ConcurrentTrie at one point in time."""
+
+	def __init__(self, root):
+		self.root = root
+
+	def getNode(self, word):
+		curr = self.root
+		for char in word:
+			curr = curr.children.get(char)
+			if curr is None:
+				return None
+		return curr
+
+	def search(self, word):
+		node = self.getNode(word)
+		return node is not None and node.is_word
+
+	def startsWith(self, prefix):
+		return self.getNode(prefix) is not None
+
+	def iter_prefix(self, prefix):
+		node = self.getNode(prefix)
+		if node is None:
+			return
+		stack = [(node, prefix)]
+		while stack:
+			node, word = stack.pop()
+			if node.is_word:
+				yield word
+			for char in sorted(node.children, reverse=True):
+				stack.append((node.children[char], word + char))
+
+
+class ConcurrentTrie:
+	"""Trie for many reader threads and concurrent writers.
+
+	Published nodes are never modified. insert copies the nodes along the
+	word's path (path copying) and then publishes the new root with a
+	single reference assignment, which is atomic. Readers take the
+	current root once and work on that snapshot without locking, so they
+	never block and never see a half-done insert. Writers are serialized
+	by a lock.
+	"""
+
+	def __init__(self):
+		self._root = _PersistentNode()
+		self._lock = threading.Lock()
+
+	def snapshot(self):
+		return TrieSnapshot(self._root)
+
+	def insert(self, word):
+		with self._lock:
+			old = self._root
+			path = [old]
+			for char in word:
+				old = old.children.get(char) if old is not None else None
+				path.append(old)
+			if old is not None and old.is_word:
+				return
+			new = _PersistentNode(True, dict(old.children) if old is not None else None)
+			for depth in range(len(word) - 1, -1, -1):
+				parent = path[depth]
+				children = dict(parent.children) if parent is not None else {}
+				children[word[depth]] = new
+				new = _PersistentNode(parent is not None and parent.is_word, children)
+			self._root = new
+
+	def search(self, word):
+		return self.snapshot().search(word)
+
+	def startsWith(self, prefix):
+		return self.snapshot().startsWith(prefix)
+
+	def iter_prefix(self, prefix):
+		return self.snapshot().iter_prefix(prefix)
+
+
+def stress_concurrent(readers=4, seconds=2.0, n=20000):
+	"""Mixed read/write run on ConcurrentTrie that checks snapshot consistency.
+
+	One writer inserts words in a fixed order. A snapshot that contains
+	word k must contain every earlier word, which readers verify.
+	"""
+	import random
+	import time
+
+	words = _sample_words(n, seed=3)
+	random.Random(3).shuffle(words)
+	position = {w: i for i, w in enumerate(words)}
+	trie = ConcurrentTrie()
+	stop = threading.Event()
+	reads, errors = [0] * readers, []
+
+	def reader(r):
+		rnd = random.Random(r)
+		count = 0
+		while not stop.is_set():
+			snap = trie.snapshot()
+			k = rnd.randrange(n)
+			if snap.search(words[k]):
+				j = rnd.randrange(k + 1)
+				if not snap.search(words[j]):
+					errors.append((words[k], words[j]))
+			for w in islice(snap.iter_prefix(words[k][:2]), 5):
+				if not snap.search(words[rnd.randrange(position[w] + 1)]):
+					errors.append(w)
+			count += 1
+		reads[r] = count
+
+	threads = [threading.Thread(target=reader, args=(r,)) for r in range(readers)]
+	for t in threads:
+		t.start()
+	start = time.perf_counter()
+	written = 0
+	while time.perf_counter() - start < seconds and written < n:
+		trie.insert(words[written])
+		written += 1
+	while time.perf_counter() - start < seconds:
+		time.sleep(0.01)
+	stop.set()
+	for t in threads:
+		t.join()
+	elapsed = time.perf_counter() - start
+	assert not errors, errors[:5]
+	print(f'{readers} readers: {sum(reads) / elapsed / 1e3:.1f}k reads/s, '
+		  f'writer: {written / elapsed / 1e3:.1f}k inserts/s, no inconsistent snapshots')
+
+
+def _sample_words(n, seed=0):
+	import random
+
+	rnd = random.Random(seed)
+	# skewed letters and shared stems, roughly like natural-language words
+	stems = [''.join(rnd.choices('etaoinshrdlucmfw', k=rnd.randint(2, 6)))
+			 for _ in range(max(1, n // 20))]
+	words = set()
+	while len(words) < n:
+		words.add(rnd.choice(stems) + ''.join(
+			rnd.choices('etaoinshrdlucmfwypvbgkjqxz', k=rnd.randint(0, 6))))
+	return sorted(words)
+
+
+def benchmark_compact(n=200000):
+	import time
+	import tracemalloc
+
+	words = _sample_words(n)
+	probes = words[::7] + [w + 'q' for w in words[::7]]
+	for name, build in (('Trie', Trie), ('CompactTrie', CompactTrie),
+						('FrozenTrie', CompactTrie)):
+		tracemalloc.start()
+		trie = build()
+		for w in words:
+			trie.insert(w)
+		if name == 'FrozenTrie':
+			trie = trie.freeze()
+		size = tracemalloc.get_traced_memory()[0]
+		tracemalloc.stop()
+		start = time.perf_counter()
+		for w in probes:
+			trie.search(w)
+		t = time.perf_counter() - start
+		print(f'{name}: {size / n:.1f} bytes/key, '
+			  f'{len(probes) / t / 1e3:.0f}k lookups/s')
+		del trie
+
+
+def benchmark_top_k(n=1000000, queries=200, k=10):
+	import random
+	import time
+
+	rnd = random.Random(1)
+	words = _sample_words(n)
+	trie = Trie(top_size=k)
+	start = time.perf_counter()
+	for w in words:
+		trie.insert(w, int(rnd.paretovariate(1.2)))
+	print(f'built Trie over {n} words in {time.perf_counter() - start:.1f}s')
+	prefixes = [w[:rnd.randint(1, 3)] for w in rnd.sample(words, queries)]
+
+	start = time.perf_counter()
+	fast = [trie.top_k(p, k) for p in prefixes]
+	t_fast = time.perf_counter() - start
+	start = time.perf_counter()
+	slow = []
+	for p in prefixes:
+		found = sorted((-trie.getNode(w).weight, w) for w in trie.iter_prefix(p))
+		slow.append([w for _, w in found[:k]])
+	t_slow = time.perf_counter() - start
+	assert fast == slow
+	print(f'top_k: {t_fast / queries * 1e6:.1f} us/query, collect and sort: '
+		  f'{t_slow / queries * 1e6:.1f} us/query')
+
+
+def benchmark_bulk(n=500000):
+	import gc
+	import time
+
+	words = _sample_words(n)
+	for top_size in (0, 10):
+		# each build starts from the same heap, so neither pays for
+		# collecting the other's nodes
+		bulk = None
+		gc.collect()
+		start = time.perf_counter()
+		trie = Trie(top_size)
+		for w in words:
+			trie.insert(w)
+		t_insert = time.perf_counter() - start
+		del trie
+		gc.collect()
+		start = time.perf_counter()
+		bulk = Trie.from_sorted(words, top_size)
+		t_bulk = time.perf_counter() - start
+		print(f'top_size={top_size} insert loop: {n / t_insert / 1e3:.0f}k words/s, '
+			  f'from_sorted: {n / t_bulk / 1e3:.0f}k words/s ({t_insert / t_bulk:.2f}x)')
+	start = time.perf_counter()
+	FrozenTrie.from_sorted(words)
+	print(f'FrozenTrie.from_sorted: {n / (time.perf_counter() - start) / 1e3:.0f}k words/s')
+
+	probes = words[::3] + [w + 'q' for w in words[::3]]
+	start = time.perf_counter()
+	one = [bulk.search(w) for w in probes]
+	t_one = time.perf_counter() - start
+	start = time.perf_counter()
+	many = bulk.search_many(probes)
+	t_many = time.perf_counter() - start
+	assert one == many
+	print(f'search loop: {t_one:.2f}s, search_many: {t_many:.2f}s')
+
+
+def _levenshtein(a, b):
+	prev = list(range(len(b) + 1))
+	for i, ca in enumerate(a, 1):
+		row = [i]
+		for j, cb in enumerate(b, 1):
+			row.append(min(row[j - 1] + 1, prev[j] + 1, prev[j - 1] + (ca != cb)))
+		prev = row
+	return prev[-1]
+
+
+def benchmark_fuzzy(n=100000, queries=20, max_dist=2):
+	import random
+	import time
+
+	rnd = random.Random(2)
+	words = _sample_words(n)
+	trie = Trie.from_sorted(words)
+	probes = []
+	for w in rnd.sample(words, queries):
+		i = rnd.randrange(len(w))
+		probes.append(w[:i] + rnd.choice('abcxyz') + w[i + 1:])
+
+	start = time.perf_counter()
+	fast = [trie.search_fuzzy(p, max_dist) for p in probes]
+	t_fast = time.perf_counter() - start
+	start = time.perf_counter()
+	slow = []
+	for p in probes:
+		found = sorted((d, w) for w in words
+					   for d in (_levenshtein(p, w),) if d <= max_dist)
+		slow.append([(w, d) for d, w in found])
+	t_slow = time.perf_counter() - start
+	assert fast == slow
+	print(f'search_fuzzy: {t_fast / queries * 1e3:.1f} ms/query, brute force: '
+		  f'{t_slow / queries * 1e3:.1f} ms/query')
+
+
 def main():
 	obj = Trie()
 	obj.insert('rops')
@@ -54,4 +789,11 @@ def main():
 	print(obj.startsWith('rop'))
 
 
-main()
\ No newline at end of file
+main()
+
+if __name__ == '__main__':
+	benchmark_compact()
+	benchmark_top_k()
+	benchmark_bulk()
+	benchmark_fuzzy()
+	stress_concurrent()
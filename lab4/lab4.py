@@ -1,6 +1,23 @@
+import heapq
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from multiprocessing.shared_memory import SharedMemory
 from statistics import median
-from typing import Tuple, List
-from collections import namedtuple
+from typing import Iterator, Optional, Tuple, List
+from collections import Counter, OrderedDict, namedtuple
+from types import SimpleNamespace
+
+try:
+    import numpy as np
+except ImportError:  # query_many falls back to one walk per query
+    np = None
 
 class Point(namedtuple('Point', ['x', 'y'])):
     __slots__ = ()
@@ -10,6 +27,8 @@ class Point(namedtuple('Point', ['x', 'y'])):
         return self.__str__()
 
 class Node:
+    __slots__ = ('p', 'med', 'left', 'right')
+
     def __init__(self, point: Point):
         self.p = point
         self.med = 0.0
@@ -27,6 +46,87 @@ class PriorityTree:
             points = list(sorted(points, key=lambda p: -p[1]))
             self.root = self._create(points)
 
+    @staticmethod
+    def build_flat(points: List[Point]) -> 'FlatPriorityTree':
+        return FlatPriorityTree(points)
+
+    def save(self, path: str) -> None:
+        self._to_flat().save(path)
+
+    @staticmethod
+    def open_mmap(path: str) -> 'FlatPriorityTree':
+        return FlatPriorityTree.open_mmap(path)
+
+    def _to_flat(self) -> 'FlatPriorityTree':
+        # preorder walk; subtree sizes are then summed up in reverse order
+        order, stack = [], [self.root]
+        while stack:
+            n = stack.pop()
+            if n is not None:
+                order.append(n)
+                stack.append(n.right)
+                stack.append(n.left)
+        size = {None: 0}
+        for n in reversed(order):
+            size[n] = 1 + size[n.left] + size[n.right]
+        return FlatPriorityTree._from_columns(
+            [n.p for n in order],
+            xs=array('d', (n.p[0] for n in order)),
+            ys=array('d', (n.p[1] for n in order)),
+            meds=array('d', (n.med for n in order)),
+            idx=array('q', range(len(order))),
+            lsize=array('q', (size[n.left] for n in order)),
+            rsize=array('q', (size[n.right] for n in order)))
+
+    @staticmethod
+    def build_parallel(points: List[Point],
+                       workers: Optional[int] = None) -> 'FlatPriorityTree':
+        """Builds a FlatPriorityTree using a pool of worker processes.
+
+        The parent builds the top levels and hands every subtree below them
+        to a worker. Because the layout is preorder, each subtree fills a
+        contiguous slice of the columns, so workers write straight into one
+        shared memory block. The subtree's orders by y and by x go into the
+        same slice of two more shared columns, so a task is only its
+        position and size and nothing per node is pickled.
+        """
+        points = list(points)
+        n = len(points)
+        if not n:
+            return FlatPriorityTree(points)
+        workers = workers or os.cpu_count()
+        shm = SharedMemory(create=True, size=8 * n * len(_BUILD_COLUMNS))
+        cols, views = {}, None
+        try:
+            cols = _shared_columns(shm.buf, n, _BUILD_COLUMNS)
+            px, py, by_y, by_x = _sorted_orders(points)
+            cols['px'][:] = memoryview(px).cast('B')
+            cols['py'][:] = memoryview(py).cast('B')
+            # about four subtrees per worker to even out the load
+            split_depth = (4 * workers - 1).bit_length()
+            views = _cast_columns(cols)
+            deferred = _build_preorder(views, px, py, [(0, by_y, by_x, 0)],
+                                       split_depth)
+            for pos, by_y, by_x, _ in deferred:
+                views.by_y[pos:pos + len(by_y)] = array('q', by_y)
+                views.by_x[pos:pos + len(by_x)] = array('q', by_x)
+            with ProcessPoolExecutor(workers) as pool:
+                futures = [pool.submit(_build_shared, shm.name, n, pos,
+                                       len(by_y))
+                           for pos, by_y, _, _ in deferred]
+                for f in futures:
+                    f.result()
+            columns = {}
+            for name in FlatPriorityTree.COLUMNS:
+                columns[name] = array(_BUILD_COLUMNS[name])
+                columns[name].frombytes(cols[name])
+        finally:
+            # views must go before close(), also when a worker failed
+            _release_columns(views, cols)
+            shm.close()
+            shm.unlink()
+        return FlatPriorityTree._from_columns(points, **columns)
+
     def _create(self, points: List[Point]) -> Node:
         if not points:
             return None
@@ -58,39 +158,38 @@ class PriorityTree:
         return n, path
 
     def queryPrioritySubtree(self, n: Node, y: float) -> list:
-        res = []
-        if n is not None and n.p.y >= y:
-            res.append(n.p)
-            res = res + self.queryPrioritySubtree(n.left, y)
-            res = res + self.queryPrioritySubtree(n.right, y)
-        return res
+        return list(self._iter_subtree(n, y))
 
+    def _iter_subtree(self, n: Node, y: float) -> Iterator[Point]:
+        stack = [n]
+        while stack:
+            n = stack.pop()
+            if n is not None and n.p.y >= y:
+                yield n.p
+                stack.append(n.right)
+                stack.append(n.left)
 
-def query(tree: PriorityTree, x: Tuple[float, float], y: float) -> List[Point]:
-    ret_list_point = []
-    qx1, qx2, qy1 = x[0], x[1], y
-    splitting_node, node_points = tree.findSplitNode(x)
+    def _iter_query(self, x: Tuple[float, float], y: float) -> Iterator[Point]:
+        qx1, qx2, qy1 = x[0], x[1], y
+        splitting_node, node_points = self.findSplitNode(x)
 
-    for n in node_points:
-        if n[0] >= qx1 and n[0] <= qx2 and n[1] >= qy1:
-            ret_list_point.append(n)
+        for p in node_points:
+            if p[0] >= qx1 and p[0] <= qx2 and p[1] >= qy1:
+                yield p
 
-    if splitting_node is None:
-        return ret_list_point
+        if splitting_node is None:
+            return
 
-    if splitting_node.left is None and splitting_node.right is None:
-        ret_list_point += tree.queryPrioritySubtree(splitting_node, qy1)
-    else:
         p_n = splitting_node.p
         if p_n.x >= qx1 and p_n.x <= qx2 and p_n.y >= qy1:
-            ret_list_point.append(splitting_node.p)
-        n = splitting_node.left
+            yield p_n
 
+        n = splitting_node.left
         while n is not None and n.p[1] >= qy1:
-            if n.p[0] >= qx1 and n.p[0] <= qx2 and n.p[1] >= qy1:
-                ret_list_point.append(n.p)
             if n.p[0] >= qx1 and n.p[0] <= qx2:
-                ret_list_point.extend(tree.queryPrioritySubtree(n.right, qy1))
+                yield n.p
+            if n.med >= qx1:
+                yield from self._iter_subtree(n.right, qy1)
                 n = n.left
             else:
                 n = n.right
@@ -98,10 +197,976 @@ def query(tree: PriorityTree, x: Tuple[float, float], y: float) -> List[Point]:
         n = splitting_node.right
         while n is not None and n.p[1] >= qy1:
             if n.p[0] >= qx1 and n.p[0] <= qx2:
-                ret_list_point.append(n.p)
-                ret_list_point.extend(tree.queryPrioritySubtree(n.left, qy1))
+                yield n.p
+            if n.med <= qx2:
+                yield from self._iter_subtree(n.left, qy1)
                 n = n.right
             else:
                 n = n.left
 
-        return ret_list_point
\ No newline at end of file
+    def iter_query(self, x: Tuple[float, float], y: float,
+                   limit: Optional[int] = None) -> Iterator[Point]:
+        """Lazily yields the points of query(); stops after limit points."""
+        it = self._iter_query(x, y)
+        return it if limit is None else islice(it, limit)
+
+    def count_query(self, x: Tuple[float, float], y: float) -> int:
+        return sum(1 for _ in self._iter_query(x, y))
+
+
+def _sorted_orders(points: List[Point]) -> Tuple[array, array, list, list]:
+    px = array('d', (p[0] for p in points))
+    py = array('d', (p[1] for p in points))
+    # same stable order by y as PriorityTree, and one order by x; every
+    # subtree keeps both orders by stable partitioning
+    by_y = sorted(range(len(points)), key=lambda i: -points[i][1])
+    by_x = sorted(range(len(points)), key=px.__getitem__)
+    return px, py, by_y, by_x
+
+
+def _build_preorder(cols, px, py, stack: list,
+                    split_depth: Optional[int] = None) -> list:
+    """Builds FlatPriorityTree subtrees into the columns of cols.
+
+    stack holds (pos, by_y, by_x, depth) tasks, one per subtree, where pos
+    is the preorder slot of the subtree root. Subtrees at split_depth are
+    not built but returned as tasks, so they can be built elsewhere.
+    """
+    xs, ys, meds, idx = cols.xs, cols.ys, cols.meds, cols.idx
+    lsize, rsize = cols.lsize, cols.rsize
+    deferred = []
+    while stack:
+        task = stack.pop()
+        pos, by_y, by_x, depth = task
+        if depth == split_depth:
+            deferred.append(task)
+            continue
+        top = by_y[0]
+        idx[pos] = top
+        xs[pos] = px[top]
+        ys[pos] = py[top]
+        if len(by_y) == 1:
+            meds[pos] = px[top]
+            continue
+        by_x.remove(top)
+        m, h = len(by_x), len(by_x) // 2
+        if m % 2:
+            med = px[by_x[h]]
+        else:
+            med = (px[by_x[h - 1]] + px[by_x[h]]) / 2
+        k = h
+        while k < m and px[by_x[k]] <= med:
+            k += 1
+        meds[pos] = med
+        lsize[pos] = k
+        rsize[pos] = m - k
+        if k < m:
+            right = [j for j in islice(by_y, 1, None) if px[j] > med]
+            stack.append((pos + 1 + k, right, by_x[k:], depth + 1))
+        if k:
+            left = [j for j in islice(by_y, 1, None) if px[j] <= med]
+            stack.append((pos + 1, left, by_x[:k], depth + 1))
+    return deferred
+
+
+# column name -> typecode, in the order they are packed in shared memory
+_SHARED_COLUMNS = {'px': 'd', 'py': 'd', 'xs': 'd', 'ys': 'd', 'meds': 'd',
+                   'idx': 'q', 'lsize': 'q', 'rsize': 'q'}
+# build_parallel also hands every deferred subtree its orders by y and by x
+_BUILD_COLUMNS = {**_SHARED_COLUMNS, 'by_y': 'q', 'by_x': 'q'}
+
+
+def _shared_columns(buf: memoryview, n: int,
+                    layout: dict = _SHARED_COLUMNS) -> dict:
+    return {name: buf[8 * n * k:8 * n * (k + 1)]
+            for k, name in enumerate(layout)}
+
+
+def _cast_columns(cols: dict) -> SimpleNamespace:
+    return SimpleNamespace(**{name: view.cast(_BUILD_COLUMNS[name])
+                              for name, view in cols.items()})
+
+
+def _release_columns(views: Optional[SimpleNamespace],
+                     cols: Optional[dict] = None) -> None:
+    # shared memory cannot be closed while views into it are alive
+    if views is not None:
+        for view in vars(views).values():
+            view.release()
+    for view in (cols or {}).values():
+        view.release()
+
+
+def _build_shared(shm_name: str, n: int, pos: int, size: int) -> None:
+    shm = SharedMemory(name=shm_name)
+    cols, views = {}, None
+    try:
+        cols = _shared_columns(shm.buf, n, _BUILD_COLUMNS)
+        views = _cast_columns(cols)
+        end = pos + size
+        _build_preorder(views, views.px, views.py,
+                        [(pos, views.by_y[pos:end].tolist(),
+                          views.by_x[pos:end].tolist(), 0)])
+    finally:
+        _release_columns(views, cols)
+        shm.close()
+
+
+_FILE_MAGIC = b'PSTREE\x00\x00'
+_FILE_VERSION = 1
+_FILE_HEADER = '=8sIIQ'
+
+
+class _ColumnPoints:
+    """Read-only list of points backed by two coordinate columns.
+
+    Points are created on access and have float coordinates.
+    """
+
+    def __init__(self, px: memoryview, py: memoryview) -> None:
+        self.px = px
+        self.py = py
+
+    def __len__(self) -> int:
+        return len(self.px)
+
+    def __getitem__(self, i: int) -> Point:
+        return Point(self.px[i], self.py[i])
+
+
+class FlatPriorityTree:
+    """Priority search tree stored in flat parallel arrays.
+
+    Builds the same tree as PriorityTree, without Node objects or recursion.
+    Nodes are laid out in preorder, so every node precedes its subtree (the
+    arrays are heap-ordered on y) and the subtree of node i occupies
+    [i, i + 1 + lsize[i] + rsize[i]). Children are implicit: the left child
+    is i + 1 and the right child is i + 1 + lsize[i]. A breadth-first
+    2i + 1 / 2i + 2 layout is not used because duplicate x coordinates can
+    skew the tree into a chain that would need 2^depth slots.
+    """
+
+    COLUMNS = ('xs', 'ys', 'meds', 'idx', 'lsize', 'rsize')
+
+    def __init__(self, points: List[Point]) -> None:
+        self.points = list(points)
+        n = len(self.points)
+        self.xs = array('d', bytes(8 * n))
+        self.ys = array('d', bytes(8 * n))
+        self.meds = array('d', bytes(8 * n))
+        self.idx = array('q', bytes(8 * n))
+        self.lsize = array('q', bytes(8 * n))
+        self.rsize = array('q', bytes(8 * n))
+        if n:
+            px, py, by_y, by_x = _sorted_orders(self.points)
+            _build_preorder(self, px, py, [(0, by_y, by_x, 0)])
+
+    @staticmethod
+    def _from_columns(points: List[Point], **columns) -> 'FlatPriorityTree':
+        tree = FlatPriorityTree([])
+        tree.points = points
+        for name in FlatPriorityTree.COLUMNS:
+            setattr(tree, name, columns[name])
+        return tree
+
+    def __len__(self) -> int:
+        return len(self.idx)
+
+    def save(self, path: str) -> None:
+        """Writes the tree in the binary format read by open_mmap.
+
+        The file is a header (magic, format version, number of points)
+        followed by the raw columns in native byte order: px and py of the
+        points in input order, then xs, ys, meds, idx, lsize and rsize.
+        """
+        px = array('d', (p[0] for p in self.points))
+        py = array('d', (p[1] for p in self.points))
+        with open(path, 'wb') as f:
+            f.write(struct.pack(_FILE_HEADER, _FILE_MAGIC, _FILE_VERSION, 0,
+                                len(self)))
+            for col in [px, py] + [getattr(self, c) for c in self.COLUMNS]:
+                f.write(col)
+
+    @staticmethod
+    def open_mmap(path: str) -> 'FlatPriorityTree':
+        """Opens a tree written by save without reading it into memory.
+
+        The columns are memoryviews over a read-only mmap of the file, so
+        opening costs O(1) and processes opening the same file share its
+        pages. Points come back with float coordinates.
+        """
+        with open(path, 'rb') as f:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header = struct.calcsize(_FILE_HEADER)
+        if len(buf) < header:
+            raise ValueError(f'{path} is not a priority tree file')
+        magic, version, _, n = struct.unpack_from(_FILE_HEADER, buf)
+        if magic != _FILE_MAGIC:
+            raise ValueError(f'{path} is not a priority tree file')
+        if version != _FILE_VERSION:
+            raise ValueError(f'{path} has unsupported format version {version}')
+        if len(buf) != header + 8 * n * len(_SHARED_COLUMNS):
+            raise ValueError(f'{path} is truncated')
+        cols = _cast_columns(_shared_columns(memoryview(buf)[header:], n))
+        tree = FlatPriorityTree._from_columns(
+            _ColumnPoints(cols.px, cols.py),
+            **{name: getattr(cols, name) for name in FlatPriorityTree.COLUMNS})
+        tree._mmap = buf
+        return tree
+
+    def left(self, i: int) -> int:
+        return i + 1 if self.lsize[i] else -1
+
+    def right(self, i: int) -> int:
+        return i + 1 + self.lsize[i] if self.rsize[i] else -1
+
+    def point(self, i: int) -> Point:
+        return self.points[self.idx[i]]
+
+    def findSplitNode(self, x: Tuple[float, float]) -> Tuple[int, list]:
+        x_left, x_right = x
+        n, path = (0 if len(self) else -1), []
+        while n != -1 and (x_left > self.meds[n] or x_right < self.meds[n]):
+            path.append(self.point(n))
+            if x_right < self.meds[n]:
+                n = self.left(n)
+            else:
+                n = self.right(n)
+        return n, path
+
+    def queryPrioritySubtree(self, n: int, y: float) -> list:
+        return [self.point(i) for i in self._iter_subtree(n, y)]
+
+    def _iter_subtree(self, n: int, y: float) -> Iterator[int]:
+        if n == -1:
+            return
+        ys, lsize, rsize = self.ys, self.lsize, self.rsize
+        stop = n + 1 + lsize[n] + rsize[n]
+        i = n
+        # preorder scan of the subtree, skipping whole subtrees below y
+        while i < stop:
+            if ys[i] >= y:
+                yield i
+                i += 1
+            else:
+                i += 1 + lsize[i] + rsize[i]
+
+    def _iter_nodes(self, x: Tuple[float, float], y: float) -> Iterator[int]:
+        """Yields node indices of query() results; path nodes come first."""
+        qx1, qx2, qy1 = x[0], x[1], y
+        xs, ys, meds = self.xs, self.ys, self.meds
+        n = 0 if len(self) else -1
+        while n != -1 and (qx1 > meds[n] or qx2 < meds[n]):
+            if xs[n] >= qx1 and xs[n] <= qx2 and ys[n] >= qy1:
+                yield n
+            if qx2 < meds[n]:
+                n = self.left(n)
+            else:
+                n = self.right(n)
+
+        splitting_node = n
+        if splitting_node == -1:
+            return
+
+        if xs[splitting_node] >= qx1 and xs[splitting_node] <= qx2 \
+                and ys[splitting_node] >= qy1:
+            yield splitting_node
+
+        n = self.left(splitting_node)
+        while n != -1 and ys[n] >= qy1:
+            if xs[n] >= qx1 and xs[n] <= qx2:
+                yield n
+            if meds[n] >= qx1:
+                yield from self._iter_subtree(self.right(n), qy1)
+                n = self.left(n)
+            else:
+                n = self.right(n)
+
+        n = self.right(splitting_node)
+        while n != -1 and ys[n] >= qy1:
+            if xs[n] >= qx1 and xs[n] <= qx2:
+                yield n
+            if meds[n] <= qx2:
+                yield from self._iter_subtree(self.left(n), qy1)
+                n = self.right(n)
+            else:
+                n = self.left(n)
+
+    def iter_query(self, x: Tuple[float, float], y: float,
+                   limit: Optional[int] = None) -> Iterator[Point]:
+        """Lazily yields the points of query(); stops after limit points."""
+        it = map(self.point, self._iter_nodes(x, y))
+        return it if limit is None else islice(it, limit)
+
+    def count_query(self, x: Tuple[float, float], y: float) -> int:
+        return sum(1 for _ in self._iter_nodes(x, y))
+
+    def query(self, x: Tuple[float, float], y: float) -> List[Point]:
+        return list(self.iter_query(x, y))
+
+    def query_handles(self, x: Tuple[float, float], y: float,
+                      limit: Optional[int] = None) -> array:
+        """Like query(), but returns indices into self.points."""
+        idx = self.idx
+        return array('q', islice((idx[i] for i in self._iter_nodes(x, y)), limit))
+
+
+class CompactPriorityTree(FlatPriorityTree):
+    """FlatPriorityTree that keeps no Point objects after the build.
+
+    The input coordinates are kept in two array('d') columns, so the whole
+    tree is eight machine words per point. Use query_handles() to get
+    point indices without creating Points; query() still works and builds
+    Points with float coordinates on demand.
+    """
+
+    def __init__(self, points: List[Point]) -> None:
+        super().__init__(points)
+        self.points = _ColumnPoints(array('d', (p[0] for p in self.points)),
+                                    array('d', (p[1] for p in self.points)))
+
+    def x(self, handle: int) -> float:
+        return self.points.px[handle]
+
+    def y(self, handle: int) -> float:
+        return self.points.py[handle]
+
+
+class DynamicPriorityTree:
+    """Priority search tree supporting insert and delete.
+
+    Uses the logarithmic method: bucket i is either empty or a
+    FlatPriorityTree over at most 2^i points, and an insert merges the
+    occupied buckets below the first empty one, for O(log^2 n) amortized
+    cost. Deletes are lazy: the point is recorded as a tombstone, skipped
+    by queries, and physically dropped the next time its bucket is
+    rebuilt; once half the stored points are dead everything is rebuilt.
+    Points behave as a multiset, deleting removes one copy. version is
+    bumped by every insert and delete.
+    """
+
+    def __init__(self, points: List[Point] = ()) -> None:
+        self.version = 0
+        self.buckets = []
+        self._live = Counter()
+        self._dead = Counter()
+        self._ndead = 0
+        self._rebuild(list(points))
+
+    def __len__(self) -> int:
+        return sum(len(b) for b in self.buckets if b is not None) - self._ndead
+
+    def __contains__(self, point: Point) -> bool:
+        return self._live[point] > 0
+
+    def _rebuild(self, points: List[Point]) -> None:
+        self.buckets = []
+        self._live = Counter(points)
+        self._dead = Counter()
+        self._ndead = 0
+        # one bucket per set bit of len(points)
+        start, i = 0, 0
+        while start < len(points):
+            size = 1 << i
+            if len(points) & size:
+                self.buckets.append(FlatPriorityTree(points[start:start + size]))
+                start += size
+            else:
+                self.buckets.append(None)
+            i += 1
+
+    def _take_live(self, tree: FlatPriorityTree, out: List[Point]) -> None:
+        for p in tree.points:
+            if self._dead[p]:
+                self._dead[p] -= 1
+                self._ndead -= 1
+            else:
+                out.append(p)
+
+    def insert(self, point: Point) -> None:
+        carry = [point]
+        i = 0
+        while i < len(self.buckets) and self.buckets[i] is not None:
+            self._take_live(self.buckets[i], carry)
+            self.buckets[i] = None
+            i += 1
+        if i == len(self.buckets):
+            self.buckets.append(None)
+        # dropped tombstones can leave carry short of 2^i points; it then
+        # goes one bucket lower, or further down if that one is occupied
+        while i > 0 and len(carry) <= 1 << (i - 1) and self.buckets[i - 1] is None:
+            i -= 1
+        self.buckets[i] = FlatPriorityTree(carry)
+        self._live[point] += 1
+        self.version += 1
+
+    def delete(self, point: Point) -> None:
+        if not self._live[point]:
+            raise ValueError(f'Point {point} is not in the tree')
+        self._live[point] -= 1
+        self._dead[point] += 1
+        self._ndead += 1
+        self.version += 1
+        if 2 * self._ndead > len(self) + self._ndead:
+            points = []
+            for b in self.buckets:
+                if b is not None:
+                    self._take_live(b, points)
+            self._rebuild(points)
+
+    def _iter_query(self, x: Tuple[float, float], y: float) -> Iterator[Point]:
+        # copies of one point share coordinates, so a query sees either
+        # all of them or none; skip as many as there are tombstones
+        skip = {}
+        for b in self.buckets:
+            if b is None:
+                continue
+            for p in b.iter_query(x, y):
+                if p in self._dead:
+                    k = skip.get(p, self._dead[p])
+                    if k:
+                        skip[p] = k - 1
+                        continue
+                yield p
+
+    def iter_query(self, x: Tuple[float, float], y: float,
+                   limit: Optional[int] = None) -> Iterator[Point]:
+        """Lazily yields the points of query(); stops after limit points."""
+        it = self._iter_query(x, y)
+        return it if limit is None else islice(it, limit)
+
+    def count_query(self, x: Tuple[float, float], y: float) -> int:
+        return sum(1 for _ in self._iter_query(x, y))
+
+
+def _y_range(y) -> Tuple[float, float]:
+    # 3-sided queries pass a single lower bound on y
+    return tuple(y) if isinstance(y, tuple) else (y, float('inf'))
+
+
+class RangeTree:
+    """Layered 2D range tree for rectangle queries [x1, x2] x [y1, y2].
+
+    The primary tree is a segment tree over the points sorted by x, with
+    node 1 as the root and children 2i and 2i + 1. Every node keeps its
+    points sorted by y, together with a fractional cascading array:
+    cascade[t] is how many of the first t entries come from the left
+    child. A query binary searches y1 once at the root and follows the
+    cascade down, so it costs O(log n + k) using O(n log n) space.
+    """
+
+    def __init__(self, points: List[Point]) -> None:
+        self.points = list(points)
+        n = len(self.points)
+        order = sorted(range(n), key=lambda i: self.points[i])
+        self.order = array('q', order)
+        self.xs = array('d', (self.points[i][0] for i in order))
+        self.ys = array('d', (self.points[i][1] for i in order))
+        self.by_y = [None] * (4 * n)
+        self.cascade = [None] * (4 * n)
+        if n:
+            self._build(1, 0, n)
+        self._root_ys = array('d', (self.ys[p] for p in (self.by_y[1] if n else ())))
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def _build(self, node: int, lo: int, hi: int) -> None:
+        if hi - lo == 1:
+            self.by_y[node] = array('q', [lo])
+            return
+        mid = (lo + hi) // 2
+        self._build(2 * node, lo, mid)
+        self._build(2 * node + 1, mid, hi)
+        left, right, ys = self.by_y[2 * node], self.by_y[2 * node + 1], self.ys
+        merged, cascade = array('q'), array('q', [0])
+        i = j = 0
+        while i < len(left) and j < len(right):
+            if ys[right[j]] < ys[left[i]]:
+                merged.append(right[j])
+                j += 1
+            else:
+                merged.append(left[i])
+                i += 1
+            cascade.append(i)
+        merged.extend(left[i:])
+        cascade.extend(range(i + 1, len(left) + 1))
+        merged.extend(right[j:])
+        cascade.extend([len(left)] * (len(right) - j))
+        self.by_y[node] = merged
+        self.cascade[node] = cascade
+
+    def _iter_query(self, x: Tuple[float, float], y) -> Iterator[int]:
+        x1, x2 = x
+        y1, y2 = _y_range(y)
+        xs, ys, by_y, cascade = self.xs, self.ys, self.by_y, self.cascade
+        a, b = bisect_left(xs, x1), bisect_right(xs, x2)
+        if a >= b:
+            return
+        stack = [(1, 0, len(xs), bisect_left(self._root_ys, y1))]
+        while stack:
+            node, lo, hi, j = stack.pop()
+            if hi <= a or b <= lo or j == len(by_y[node]):
+                continue
+            if a <= lo and hi <= b:
+                ordered = by_y[node]
+                for t in range(j, len(ordered)):
+                    p = ordered[t]
+                    if ys[p] > y2:
+                        break
+                    yield self.order[p]
+                continue
+            mid = (lo + hi) // 2
+            c = cascade[node][j]
+            stack.append((2 * node + 1, mid, hi, j - c))
+            stack.append((2 * node, lo, mid, c))
+
+    def iter_query(self, x: Tuple[float, float], y,
+                   limit: Optional[int] = None) -> Iterator[Point]:
+        """Yields points in [x1, x2] x [y1, y2]; y may be a lone y1."""
+        it = map(self.points.__getitem__, self._iter_query(x, y))
+        return it if limit is None else islice(it, limit)
+
+    def count_query(self, x: Tuple[float, float], y) -> int:
+        return sum(1 for _ in self._iter_query(x, y))
+
+
+class KDTree:
+    """Array-backed 2D k-d tree for rectangle and k-nearest queries.
+
+    Points are permuted so that the subtree over positions [lo, hi) has
+    its splitting point at mid = (lo + hi) // 2, with smaller coordinates
+    in [lo, mid) and larger ones in (mid, hi). The split axis alternates
+    with depth, starting with x. No node objects or child links are kept.
+    """
+
+    def __init__(self, points: List[Point]) -> None:
+        self.points = list(points)
+        perm = list(range(len(self.points)))
+        stack = [(0, len(perm), 0)]
+        while stack:
+            lo, hi, axis = stack.pop()
+            if hi - lo <= 1:
+                continue
+            perm[lo:hi] = sorted(perm[lo:hi], key=lambda i: self.points[i][axis])
+            mid = (lo + hi) // 2
+            stack.append((lo, mid, 1 - axis))
+            stack.append((mid + 1, hi, 1 - axis))
+        self.idx = array('q', perm)
+        self.xs = array('d', (self.points[i][0] for i in perm))
+        self.ys = array('d', (self.points[i][1] for i in perm))
+
+    def __len__(self) -> int:
+        return len(self.idx)
+
+    def _iter_query(self, x: Tuple[float, float], y) -> Iterator[int]:
+        x1, x2 = x
+        y1, y2 = _y_range(y)
+        xs, ys = self.xs, self.ys
+        stack = [(0, len(xs), 0)]
+        while stack:
+            lo, hi, axis = stack.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            if x1 <= xs[mid] <= x2 and y1 <= ys[mid] <= y2:
+                yield self.idx[mid]
+            lower, upper, pivot = (x1, x2, xs[mid]) if axis == 0 else (y1, y2, ys[mid])
+            if upper >= pivot:
+                stack.append((mid + 1, hi, 1 - axis))
+            if lower <= pivot:
+                stack.append((lo, mid, 1 - axis))
+
+    def iter_query(self, x: Tuple[float, float], y,
+                   limit: Optional[int] = None) -> Iterator[Point]:
+        """Yields points in [x1, x2] x [y1, y2]; y may be a lone y1."""
+        it = map(self.points.__getitem__, self._iter_query(x, y))
+        return it if limit is None else islice(it, limit)
+
+    def count_query(self, x: Tuple[float, float], y) -> int:
+        return sum(1 for _ in self._iter_query(x, y))
+
+    def _knn(self, qx: float, qy: float, k: int) -> List[Tuple[float, int]]:
+        if k < 0:
+            raise ValueError(f'k must be non-negative, got {k}')
+        if k == 0:
+            return []
+        xs, ys = self.xs, self.ys
+        best = []  # max-heap of (-squared distance, -position)
+        stack = [(0, len(xs), 0, 0.0)]
+        while stack:
+            lo, hi, axis, bound = stack.pop()
+            if lo >= hi or (len(best) == k and bound >= -best[0][0]):
+                continue
+            mid = (lo + hi) // 2
+            dx, dy = xs[mid] - qx, ys[mid] - qy
+            d = dx * dx + dy * dy
+            if len(best) < k:
+                heapq.heappush(best, (-d, -mid))
+            elif d < -best[0][0]:
+                heapq.heapreplace(best, (-d, -mid))
+            diff = -dx if axis == 0 else -dy
+            near, far = ((lo, mid), (mid + 1, hi)) if diff <= 0 else ((mid + 1, hi), (lo, mid))
+            # the far side is popped last, once best has tightened
+            stack.append((far[0], far[1], 1 - axis, max(bound, diff * diff)))
+            stack.append((near[0], near[1], 1 - axis, bound))
+        return sorted((-d, self.idx[-m]) for d, m in best)
+
+    def knn(self, q: Point, k: int) -> List[Point]:
+        """Returns the k points nearest to q, closest first; [] for k == 0."""
+        return [self.points[i] for _, i in self._knn(q[0], q[1], k)]
+
+    def knn_many(self, qxs, qys, k: int) -> Tuple[array, array]:
+        """k-nearest neighbours of a batch of query points.
+
+        Returns flat arrays of k point indices and k squared distances per
+        query, closest first; -1 and inf pad queries when len(self) < k.
+        k == 0 gives empty arrays; a negative k raises ValueError.
+        """
+        if k < 0:
+            raise ValueError(f'k must be non-negative, got {k}')
+        indices, dists = array('q'), array('d')
+        pad = max(0, k - len(self))
+        search = self._knn
+        for qx, qy in zip(qxs, qys):
+            for d, i in search(qx, qy, k):
+                indices.append(i)
+                dists.append(d)
+            indices.extend([-1] * pad)
+            dists.extend([float('inf')] * pad)
+        return indices, dists
+
+
+class QueryCache:
+    """LRU cache of query results in front of any of the trees above.
+
+    Results are keyed on the normalized query (float bounds, y as a
+    (y1, y2) range) and evicted least recently used first once their
+    estimated size exceeds max_bytes; ttl, in seconds, optionally expires
+    them too. The size estimate counts the cached lists and, for trees
+    that build Points on access (a points column that is not a plain
+    list, as in CompactPriorityTree and open_mmap trees), the Points
+    themselves; otherwise they are shared with the tree. Trees with a
+    version attribute (DynamicPriorityTree) drop the cache whenever they
+    are mutated. evictions counts entries dropped for size or age. The
+    cache has the tree's query interface, so query(cache, x, y) works.
+    """
+
+    def __init__(self, tree, max_bytes: int = 64 << 20,
+                 ttl: Optional[float] = None, clock=time.monotonic) -> None:
+        self.tree = tree
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = OrderedDict()  # key -> (expires, result, size)
+        self.size = 0
+        self.hits = self.misses = self.evictions = 0
+        self._version = getattr(tree, 'version', None)
+        points = getattr(tree, 'points', None)
+        # Points built per access are owned by the cache
+        self._point_bytes = (0 if points is None or isinstance(points, list)
+                             else sys.getsizeof(Point(0.0, 0.0))
+                             + 2 * sys.getsizeof(0.0))
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def stats(self) -> dict:
+        return {'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'entries': len(self.entries),
+                'bytes': self.size}
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.size = 0
+
+    def _lookup(self, x: Tuple[float, float], y) -> List[Point]:
+        version = getattr(self.tree, 'version', None)
+        if version != self._version:
+            self.clear()
+            self._version = version
+        y1, y2 = _y_range(y)
+        key = (float(x[0]), float(x[1]), float(y1), float(y2))
+        now = self.clock()
+        entry = self.entries.get(key)
+        if entry is not None:
+            if entry[0] is None or now < entry[0]:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return entry[1]
+            self._evict(key)
+        self.misses += 1
+        result = list(self.tree.iter_query(x, y))
+        size = (sys.getsizeof(result) + sys.getsizeof(key)
+                + self._point_bytes * len(result))
+        if size <= self.max_bytes:
+            while self.size + size > self.max_bytes:
+                self._evict(next(iter(self.entries)))
+            expires = None if self.ttl is None else now + self.ttl
+            self.entries[key] = (expires, result, size)
+            self.size += size
+        return result
+
+    def _evict(self, key) -> None:
+        self.size -= self.entries.pop(key)[2]
+        self.evictions += 1
+
+    def iter_query(self, x: Tuple[float, float], y,
+                   limit: Optional[int] = None) -> Iterator[Point]:
+        return islice(self._lookup(x, y), limit)
+
+    def count_query(self, x: Tuple[float, float], y) -> int:
+        return len(self._lookup(x, y))
+
+    def query(self, x: Tuple[float, float], y) -> List[Point]:
+        return list(self._lookup(x, y))
+
+
+def query(tree: PriorityTree, x: Tuple[float, float], y: float,
+          limit: Optional[int] = None) -> List[Point]:
+    return list(tree.iter_query(x, y, limit))
+
+
+def count_query(tree: PriorityTree, x: Tuple[float, float], y: float) -> int:
+    return tree.count_query(x, y)
+
+
+def query_many(tree: FlatPriorityTree, xs1, xs2, ys) -> Tuple[array, array]:
+    """Answers a batch of 3-sided queries [xs1[i], xs2[i]] x [ys[i], inf).
+
+    Returns the results in CSR form: the answer to query i is
+    tree.points[j] for j in indices[offsets[i]:offsets[i + 1]], listed in
+    the same order as query() would return them. With NumPy the whole
+    batch descends the tree together, one level at a time; without it
+    each query runs the same walk as FlatPriorityTree.query_handles.
+    """
+    if not isinstance(tree, FlatPriorityTree):
+        raise TypeError('query_many needs a tree built with PriorityTree.build_flat')
+    if not len(xs1) == len(xs2) == len(ys):
+        raise ValueError('xs1, xs2 and ys must have the same length')
+    if np is not None and len(tree) and len(xs1):
+        return _query_many_levels(tree, xs1, xs2, ys)
+    offsets = array('q', [0])
+    indices = array('q')
+    idx = tree.idx
+    for qx1, qx2, qy1 in zip(xs1, xs2, ys):
+        indices.extend(map(idx.__getitem__, tree._iter_nodes((qx1, qx2), qy1)))
+        offsets.append(len(indices))
+    return offsets, indices
+
+
+# frontier states of _query_many_levels: the search path down to the split
+# node, the walks down its left and right subtrees, and whole subtrees
+# hanging off those walks that are reported down to y
+_PATH, _LEFT, _RIGHT, _SUB = range(4)
+
+
+def _query_many_levels(tree: FlatPriorityTree, xs1, xs2,
+                       ys) -> Tuple[array, array]:
+    """query_many as a level-synchronous walk over the flat columns.
+
+    The frontier holds one row per (query, node) pair and every step moves
+    all rows down one level with array operations, so the per-node work of
+    the whole batch runs in NumPy instead of the interpreter. Reported
+    nodes are sorted back into query() order by (query, section, owner,
+    node): section 0 is the search path, 1 the left walk and 2 the right
+    walk, and owner is the level of the left-walk node a reported subtree
+    hangs off, since that subtree comes before the walk's next node.
+    Within those groups preorder, i.e. the node position, gives the order.
+    """
+    xs, ys_, meds = (np.asarray(c, dtype=np.float64)
+                     for c in (tree.xs, tree.ys, tree.meds))
+    lsize, rsize = (np.asarray(c, dtype=np.int64)
+                    for c in (tree.lsize, tree.rsize))
+    qx1, qx2, qy1 = (np.asarray(c, dtype=np.float64) for c in (xs1, xs2, ys))
+    m = len(qx1)
+    qid = np.arange(m, dtype=np.int64)
+    node = np.zeros(m, dtype=np.int64)
+    mode = np.full(m, _PATH, dtype=np.int8)
+    section = np.zeros(m, dtype=np.int8)
+    owner = np.zeros(m, dtype=np.int64)
+    hits = []
+    level = 0
+    while len(qid):
+        x, y, med = xs[node], ys_[node], meds[node]
+        a, b, c = qx1[qid], qx2[qid], qy1[qid]
+        path, sub = mode == _PATH, mode == _SUB
+        walk_l, walk_r = mode == _LEFT, mode == _RIGHT
+        owner[walk_l] = level
+        above = y >= c
+        report = np.where(sub, above, above & (x >= a) & (x <= b))
+        hits.append((qid[report], section[report], owner[report], node[report]))
+
+        # every row goes on to its left child, its right child or both
+        split = path & (a <= med) & (b >= med)
+        walk_l &= above
+        walk_r &= above
+        sub &= above
+        on_path = path & ~split
+        to_left = ((on_path & (b < med)) | split | (walk_l & (med >= a))
+                   | walk_r | sub)
+        to_right = ((on_path & (b >= med)) | split | walk_l
+                    | (walk_r & (med <= b)) | sub)
+        to_left &= lsize[node] > 0
+        to_right &= rsize[node] > 0
+        left_mode = np.select([on_path, split | walk_l, walk_r & (med > b)],
+                              [_PATH, _LEFT, _RIGHT], _SUB)
+        right_mode = np.select([on_path, split | walk_r, walk_l & (med < a)],
+                               [_PATH, _RIGHT, _LEFT], _SUB)
+        right_section = np.where(split, 2, section)
+        section[split] = 1
+        l, r = np.flatnonzero(to_left), np.flatnonzero(to_right)
+        node = np.concatenate((node[l] + 1, node[r] + 1 + lsize[node[r]]))
+        mode = np.concatenate((left_mode[l], right_mode[r])).astype(np.int8)
+        section = np.concatenate((section[l], right_section[r]))
+        qid = np.concatenate((qid[l], qid[r]))
+        owner = np.concatenate((owner[l], owner[r]))
+        level += 1
+
+    hit_q, hit_s, hit_o, hit_n = (np.concatenate(col) for col in zip(*hits))
+    # (query, node) pairs are unique, so when the four keys fit in one
+    # int64 a plain sort of the packed key is a lot cheaper than lexsort
+    shift_s = len(tree).bit_length() + level.bit_length()
+    shift_q = shift_s + 2
+    if shift_q + m.bit_length() < 63:
+        order = np.argsort((hit_q << shift_q)
+                           | (hit_s.astype(np.int64) << shift_s)
+                           | (hit_o << len(tree).bit_length()) | hit_n)
+    else:
+        order = np.lexsort((hit_n, hit_o, hit_s, hit_q))
+    offsets = array('q', [0])
+    offsets.frombytes(np.cumsum(np.bincount(hit_q, minlength=m),
+                                dtype=np.int64).tobytes())
+    indices = array('q')
+    idx = np.asarray(tree.idx, dtype=np.int64)
+    indices.frombytes(idx[hit_n[order]].tobytes())
+    return offsets, indices
+
+
+def benchmark_query_many(n: int = 100000, queries: int = 10000) -> None:
+    import random
+    import time
+
+    rnd = random.Random(0)
+    points = [Point(rnd.random(), rnd.random()) for _ in range(n)]
+    tree = PriorityTree.build_flat(points)
+    xs1 = [rnd.random() * 0.9 for _ in range(queries)]
+    xs2 = [x + 0.1 for x in xs1]
+    ys = [rnd.uniform(0.9, 1.0) for _ in range(queries)]
+
+    start = time.perf_counter()
+    loop = [query(tree, (x1, x2), y) for x1, x2, y in zip(xs1, xs2, ys)]
+    t_loop = time.perf_counter() - start
+    start = time.perf_counter()
+    offsets, indices = query_many(tree, xs1, xs2, ys)
+    t_many = time.perf_counter() - start
+
+    assert offsets[-1] == sum(map(len, loop))
+    print(f'{queries} queries over {n} points, {offsets[-1]} hits')
+    print(f'query() loop: {t_loop:.3f}s  query_many: {t_many:.3f}s  '
+          f'speedup: {t_loop / t_many:.2f}x')
+
+
+def benchmark_build_parallel(n: int = 200000, workers=(1, 2, 4, 8)) -> None:
+    import random
+    import time
+
+    rnd = random.Random(0)
+    points = [Point(rnd.random(), rnd.random()) for _ in range(n)]
+    start = time.perf_counter()
+    PriorityTree.build_flat(points)
+    print(f'build_flat over {n} points: {time.perf_counter() - start:.3f}s')
+    base = None
+    for w in workers:
+        start = time.perf_counter()
+        PriorityTree.build_parallel(points, workers=w)
+        t = time.perf_counter() - start
+        base = base or t
+        print(f'build_parallel workers={w}: {t:.3f}s  speedup: {base / t:.2f}x  '
+              f'efficiency: {base / (t * w):.0%}')
+
+
+def benchmark_memory(n: int = 200000, queries: int = 2000) -> None:
+    import random
+    import time
+    import tracemalloc
+
+    rnd = random.Random(0)
+    coords = [(rnd.random(), rnd.random()) for _ in range(n)]
+    windows = [(x, x + 0.01, rnd.uniform(0.5, 1.0))
+               for x in (rnd.random() for _ in range(queries))]
+    for build in (PriorityTree, FlatPriorityTree, CompactPriorityTree):
+        tracemalloc.start()
+        # points are created inside the traced region and only the tree
+        # keeps them alive, so every representation pays for its storage
+        tree = build([Point(x, y) for x, y in coords])
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        start = time.perf_counter()
+        for x1, x2, y in windows:
+            query(tree, (x1, x2), y)
+        t = time.perf_counter() - start
+        print(f'{build.__name__}: {size / n:.1f} bytes/point, '
+              f'query(): {t / queries * 1e6:.1f} us')
+        if isinstance(tree, FlatPriorityTree):
+            start = time.perf_counter()
+            for x1, x2, y in windows:
+                tree.query_handles((x1, x2), y)
+            t = time.perf_counter() - start
+            print(f'{build.__name__}: query_handles(): {t / queries * 1e6:.1f} us')
+        del tree
+
+
+def benchmark_range_search(n: int = 100000, queries: int = 2000) -> None:
+    import random
+    import time
+
+    rnd = random.Random(0)
+    points = [Point(rnd.random(), rnd.random()) for _ in range(n)]
+    windows = [(x, x + 0.05, rnd.uniform(0.8, 1.0))
+               for x in (rnd.random() for _ in range(queries))]
+    expected = None
+    for build in (PriorityTree.build_flat, RangeTree, KDTree):
+        start = time.perf_counter()
+        tree = build(points)
+        t_build = time.perf_counter() - start
+        start = time.perf_counter()
+        counts = [tree.count_query((x1, x2), y) for x1, x2, y in windows]
+        t_query = time.perf_counter() - start
+        expected = expected or counts
+        assert counts == expected
+        print(f'{type(tree).__name__}: build {t_build:.2f}s, 3-sided query '
+              f'{t_query / queries * 1e6:.1f} us ({sum(counts) / queries:.0f} hits)')
+
+
+def fuzz_dynamic_priority_tree(rounds: int = 2000, seed: int = 0) -> None:
+    """Checks DynamicPriorityTree against a brute-force filter."""
+    import random
+
+    rnd = random.Random(seed)
+    tree, points = DynamicPriorityTree(), []
+    for _ in range(rounds):
+        if points and rnd.random() < 0.4:
+            p = rnd.choice(points)
+            points.remove(p)
+            tree.delete(p)
+        else:
+            p = Point(rnd.randint(0, 30), rnd.randint(0, 30))
+            points.append(p)
+            tree.insert(p)
+        x1 = rnd.randint(-2, 32)
+        x2 = rnd.randint(x1, 33)
+        y = rnd.randint(-2, 32)
+        expected = [p for p in points if x1 <= p.x <= x2 and p.y >= y]
+        got = query(tree, (x1, x2), y)
+        assert sorted(got) == sorted(expected), (x1, x2, y, got, expected)
+        assert len(tree) == len(points)
+    print(f'DynamicPriorityTree matches brute force on {rounds} operations')
+
+
+if __name__ == '__main__':
+    fuzz_dynamic_priority_tree()
+    benchmark_query_many()
+    benchmark_build_parallel()
+    benchmark_memory()
+    benchmark_range_search()
@@ -1,4 +1,10 @@
 import heapq
+import os
+import struct
+import sys
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
 
 TOL_DEC = 3
 TOLERANCE = 10**-TOL_DEC
@@ -111,8 +117,10 @@ def Huffman_tree(symbol_with_probs: dict) -> Node:
 ####################### IT'S BETTER NOT TO MODIFY THE CODE BELOW ##############
 
 
-def calculate_codes(node: Node, val: str = '', codes=dict()) -> dict:
+def calculate_codes(node: Node, val: str = '', codes: dict = None) -> dict:
     # calculates codewords for Huffman subtree starting from node
+    if codes is None:
+        codes = {}
 
     newVal = val + str(node.code)
 
@@ -167,24 +175,1176 @@ def roundToDecimals(num: float, decimals: int) -> float:
 
 
 
+DECODE_BITS = 12  # bits looked up per decode table probe
+
+
+def byte_probabilities(data: bytes) -> dict:
+    """Counts byte frequencies in a form Huffman_tree accepts
+
+    Args:
+        data (bytes): payload to be coded
+
+    Returns:
+        dict: one-character symbol (chr of the byte) - probability
+    """
+    counts = [0]*256
+    for b in data:
+        counts[b] += 1
+    return {chr(b): c/len(data) for b, c in enumerate(counts) if c}
+
+
+def code_table(tree: Node) -> tuple:
+    """Integer code and length of every byte symbol in a Huffman tree
+
+    Args:
+        tree (Node): root of a tree built by Huffman_tree over byte symbols
+
+    Returns:
+        tuple: (codes, lengths), two lists indexed by byte value; bytes
+               without a code have length 0
+    """
+    codes = [0]*256
+    lengths = [0]*256
+    if tree.left is None:
+        # a lone symbol still needs one bit per occurrence
+        lengths[_byte_symbol(tree)] = 1
+        return codes, lengths
+    stack = [(tree, 0, 0)]
+    while stack:
+        node, code, length = stack.pop()
+        if node.left is None:
+            b = _byte_symbol(node)
+            codes[b] = code
+            lengths[b] = length
+        else:
+            stack.append((node.left, code << 1, length + 1))
+            stack.append((node.right, code << 1 | 1, length + 1))
+    return codes, lengths
+
+
+def _byte_symbol(node: Node) -> int:
+    if len(node.symbol) != 1 or ord(node.symbol) > 255:
+        raise ValueError(f'symbol {node.symbol!r} is not a single byte')
+    return ord(node.symbol)
+
+
+def encode_bytes(data: bytes, tree: Node, chunk: int = 1 << 16) -> tuple:
+    """Bit-packed Huffman encoding
+
+    Args:
+        data (bytes): payload, every byte must have a code in tree
+        tree (Node): Huffman tree over byte symbols
+        chunk (int): input bytes packed per step
+
+    Returns:
+        tuple: (encoded bytes, number of valid bits); the last byte is
+               padded with zero bits
+    """
+    return _pack(data, *code_table(tree), chunk)
+
+
+def decode_bytes(encoded: bytes, nbits: int, tree: Node,
+                 k: int = DECODE_BITS) -> bytes:
+    """Decodes the output of encode_bytes
+
+    Args:
+        encoded (bytes): bit-packed codes
+        nbits (int): number of valid bits in encoded
+        tree (Node): the tree used for encoding
+        k (int): bits looked up per table probe
+
+    Returns:
+        bytes: decoded payload
+    """
+    return _unpack(encoded, nbits, *code_table(tree), k)
+
+
+def _pack(data: bytes, codes: list, lengths: list, chunk: int) -> tuple:
+    # Each chunk of the input is turned into its bit string with one join
+    # over the per-byte table and packed with a single int conversion, which
+    # is much faster than shifting codes into an accumulator byte by byte.
+    bits = [format(c, f'0{l}b') if l else None for c, l in zip(codes, lengths)]
+    out = bytearray()
+    rest = ''
+    for i in range(0, len(data), chunk):
+        block = data[i:i + chunk]
+        try:
+            rest = _pack_bits(out, rest + ''.join([bits[b] for b in block]))
+        except TypeError:
+            b = next(b for b in block if bits[b] is None)
+            raise ValueError(f'byte {b} has no code') from None
+    return _finish_bits(out, rest)
+
+
+def _pack_bits(out: bytearray, s: str) -> str:
+    # appends the whole bytes of a '0'/'1' string, returns the leftover bits
+    whole = len(s) & ~7
+    if whole:
+        out += int(s[:whole], 2).to_bytes(whole >> 3, 'big')
+    return s[whole:]
+
+
+def _finish_bits(out: bytearray, rest: str) -> tuple:
+    nbits = 8*len(out) + len(rest)
+    if rest:
+        out.append(int(rest, 2) << (8 - len(rest)))
+    return bytes(out), nbits
+
+
+def decode_table(codes: list, lengths: list, k: int = DECODE_BITS) -> list:
+    """Multi-symbol lookup table for decoding
+
+    Entry w describes the k-bit window w: the bytes of every code that ends
+    inside it and the number of bits they take. Codes longer than k bits
+    leave the entry empty. Built from the code arrays alone in O(2**k + 256).
+
+    Args:
+        codes (list): integer code of every byte
+        lengths (list): code length of every byte, 0 if it has no code
+        k (int): window width in bits
+
+    Returns:
+        list: 2**k tuples (bytes, used bits)
+    """
+    mask = (1 << k) - 1
+    first = [None]*(1 << k)  # code that starts the window
+    for b, (c, l) in enumerate(zip(codes, lengths)):
+        if 0 < l <= k:
+            start = c << (k - l)
+            for w in range(start, start + (1 << (k - l))):
+                first[w] = (b, l)
+    table = []
+    for w in range(1 << k):
+        out = bytearray()
+        used = 0
+        entry = first[w]
+        while entry is not None and used + entry[1] <= k:
+            out.append(entry[0])
+            used += entry[1]
+            entry = first[(w << used) & mask]
+        table.append((bytes(out), used))
+    return table
+
+
+def _unpack(encoded: bytes, nbits: int, codes: list, lengths: list,
+            k: int) -> bytes:
+    table = decode_table(codes, lengths, k)
+    symbols = {(l, c): bytes((b,))
+               for b, (c, l) in enumerate(zip(codes, lengths)) if l}
+    mask = (1 << k) - 1
+    data = bytes(encoded) + bytes(16)  # refills may read past the end
+    output = []
+    append = output.append
+    acc = n = i = pos = 0
+    while pos < nbits:
+        if n < k:
+            acc = ((acc & ((1 << n) - 1)) << 64
+                   | int.from_bytes(data[i:i + 8], 'big'))
+            i += 8
+            n += 64
+        if nbits - pos >= k:
+            w = (acc >> (n - k)) & mask
+            out, used = table[w]
+            if used:
+                append(out)
+                n -= used
+                pos += used
+                continue
+            code, length = w, k
+            n -= k
+            pos += k
+        else:
+            code = length = 0
+        # code longer than the window, or the last few bits of the stream
+        while (length, code) not in symbols:
+            if pos == nbits or length > 255:
+                raise ValueError('encoded data ends in the middle of a code')
+            if n == 0:
+                acc = int.from_bytes(data[i:i + 8], 'big')
+                i += 8
+                n = 64
+            n -= 1
+            pos += 1
+            length += 1
+            code = code << 1 | (acc >> n) & 1
+        append(symbols[length, code])
+    return b''.join(output)
+
+
+def code_lengths(tree: Node) -> dict:
+    """Code length of every symbol in a Huffman tree
+
+    Args:
+        tree (Node): root of a tree built by Huffman_tree
+
+    Returns:
+        dict: symbol - code length
+    """
+    if tree.left is None:
+        return {tree.symbol: 1}
+    lengths = {}
+    stack = [(tree, 0)]
+    while stack:
+        node, length = stack.pop()
+        if node.left is None:
+            lengths[node.symbol] = length
+        else:
+            stack.append((node.left, length + 1))
+            stack.append((node.right, length + 1))
+    return lengths
+
+
+def huffman_code_lengths(symbol_with_probs: dict) -> dict:
+    """Huffman code lengths without building a tree
+
+    The weights are sorted once; the merges then run as the linear two-queue
+    algorithm, in place in a single array (Moffat and Katajainen): the array
+    first holds parent pointers of internal nodes, then their depths, then
+    the leaf code lengths. Equal weights are resolved by position in the
+    sorted order (leaves before merged nodes), so the result does not depend
+    on float tolerances and the builder handles alphabets of any size.
+
+    Args:
+        symbol_with_probs (dict): symbol - probability (or count)
+
+    Returns:
+        dict: symbol - code length
+    """
+    symbols = sorted(symbol_with_probs, key=lambda s: (symbol_with_probs[s], s))
+    n = len(symbols)
+    if n <= 1:
+        return {s: 1 for s in symbols}
+    A = [symbol_with_probs[s] for s in symbols]
+    # phase 1: A[root] are internal node weights turned into parent indices,
+    # A[leaf] the leaves still waiting to be merged
+    A[0] += A[1]
+    root = 0
+    leaf = 2
+    for nxt in range(1, n - 1):
+        if leaf >= n or A[root] < A[leaf]:
+            A[nxt] = A[root]
+            A[root] = nxt
+            root += 1
+        else:
+            A[nxt] = A[leaf]
+            leaf += 1
+        if leaf >= n or (root < nxt and A[root] < A[leaf]):
+            A[nxt] += A[root]
+            A[root] = nxt
+            root += 1
+        else:
+            A[nxt] += A[leaf]
+            leaf += 1
+    # phase 2: parent indices to internal node depths
+    A[n - 2] = 0
+    for nxt in range(n - 3, -1, -1):
+        A[nxt] = A[A[nxt]] + 1
+    # phase 3: internal node depths to leaf depths, longest codes first
+    available = 1
+    depth = 0
+    root = n - 2
+    nxt = n - 1
+    while available > 0:
+        used = 0
+        while root >= 0 and A[root] == depth:
+            used += 1
+            root -= 1
+        while available > used:
+            A[nxt] = depth
+            nxt -= 1
+            available -= 1
+        available = 2*used
+        depth += 1
+    return dict(zip(symbols, A))
+
+
+def limited_code_lengths(symbol_with_probs: dict, max_length: int) -> dict:
+    """Optimal code lengths no longer than max_length (package-merge)
+
+    Args:
+        symbol_with_probs (dict): symbol - probability (or count)
+        max_length (int): longest allowed code
+
+    Returns:
+        dict: symbol - code length
+    """
+    symbols = sorted(symbol_with_probs, key=lambda s: (symbol_with_probs[s], s))
+    n = len(symbols)
+    if n <= 1:
+        return {s: 1 for s in symbols}
+    if n > 1 << max_length:
+        raise ValueError(f'{n} symbols do not fit in codes of {max_length} bits')
+    # items are (weight, order, payload); payload is a symbol index for a
+    # leaf or the pair of items merged into a package
+    leaves = [(symbol_with_probs[s], 0, i) for i, s in enumerate(symbols)]
+    items = leaves
+    for _ in range(max_length - 1):
+        packages = [(items[j][0] + items[j + 1][0], 1, (items[j], items[j + 1]))
+                    for j in range(0, len(items) - 1, 2)]
+        items = list(heapq.merge(leaves, packages, key=lambda item: item[:2]))
+    counts = [0]*n
+    stack = items[:2*n - 2]
+    while stack:
+        payload = stack.pop()[2]
+        if type(payload) is int:
+            counts[payload] += 1
+        else:
+            stack.extend(payload)
+    return dict(zip(symbols, counts))
+
+
+def canonical_code_table(lengths: list) -> tuple:
+    """Canonical codes for code lengths indexed by symbol number
+
+    Codes are assigned in order of (length, symbol), so the lengths alone
+    describe the whole code. Runs in O(len(lengths) + longest code).
+
+    Args:
+        lengths (list): code length of every symbol, 0 if it has no code
+
+    Returns:
+        tuple: (codes, lengths) as taken by decode_table
+    """
+    longest = max(lengths, default=0)
+    count = [0]*(longest + 1)
+    for l in lengths:
+        count[l] += 1
+    count[0] = 0
+    next_code = [0]*(longest + 1)
+    code = 0
+    for l in range(1, longest + 1):
+        code = (code + count[l - 1]) << 1
+        if code + count[l] > 1 << l:
+            raise ValueError('code lengths oversubscribe the code space')
+        next_code[l] = code
+    codes = [0]*len(lengths)
+    for s, l in enumerate(lengths):
+        if l:
+            codes[s] = next_code[l]
+            next_code[l] += 1
+    return codes, list(lengths)
+
+
+def canonical_codes(lengths: dict) -> dict:
+    """Canonical codewords in the form Huffman_encode takes
+
+    Args:
+        lengths (dict): symbol - code length, e.g. from code_lengths
+
+    Returns:
+        dict: symbol - codeword string
+    """
+    symbols = sorted(lengths)
+    codes, _ = canonical_code_table([lengths[s] for s in symbols])
+    return {s: format(c, f'0{lengths[s]}b') for s, c in zip(symbols, codes)}
+
+
+def byte_code_lengths(lengths: dict) -> list:
+    """Code lengths of one-byte symbols as a list indexed by byte value"""
+    table = [0]*256
+    for s, l in lengths.items():
+        table[ord(s)] = l
+    return table
+
+
+def pack_lengths(lengths: list) -> bytes:
+    """Serializes byte code lengths, two per byte when they all fit in 4 bits
+
+    Args:
+        lengths (list): 256 code lengths, as from byte_code_lengths
+
+    Returns:
+        bytes: a width byte (4 or 8) followed by the lengths
+    """
+    if max(lengths) < 16:
+        return bytes([4]) + bytes(lengths[i] << 4 | lengths[i + 1]
+                                  for i in range(0, 256, 2))
+    return bytes([8]) + bytes(lengths)
+
+
+def unpack_lengths(header: bytes) -> list:
+    """Inverse of pack_lengths
+
+    Args:
+        header (bytes): serialized code lengths
+
+    Returns:
+        list: 256 code lengths
+    """
+    if header[0] == 4:
+        lengths = []
+        for b in header[1:129]:
+            lengths += (b >> 4, b & 15)
+        return lengths
+    if header[0] == 8:
+        return list(header[1:257])
+    raise ValueError(f'unknown code length width {header[0]}')
+
+
+def canonical_encode(data: bytes, lengths: list,
+                     chunk: int = 1 << 16) -> tuple:
+    """Bit-packed encoding with the canonical code for byte code lengths
+
+    Args:
+        data (bytes): payload, every byte must have a nonzero length
+        lengths (list): 256 code lengths
+        chunk (int): input bytes packed per step
+
+    Returns:
+        tuple: (encoded bytes, number of valid bits)
+    """
+    return _pack(data, *canonical_code_table(lengths), chunk)
+
+
+def canonical_decode(encoded: bytes, nbits: int, lengths: list,
+                     k: int = DECODE_BITS) -> bytes:
+    """Decodes canonical_encode output from the code lengths alone
+
+    Args:
+        encoded (bytes): bit-packed codes
+        nbits (int): number of valid bits in encoded
+        lengths (list): the 256 code lengths used for encoding
+        k (int): bits looked up per table probe
+
+    Returns:
+        bytes: decoded payload
+    """
+    return _unpack(encoded, nbits, *canonical_code_table(lengths), k)
+
+
+BLOCK_SIZE = 1 << 20  # input bytes per independently coded block
+MAX_CODE_LENGTH = 15  # keeps the packed length table at 4 bits a symbol
+_STREAM_MAGIC = b'HUFS\x00\x01'
+_BLOCK_HEADER = struct.Struct('>IQ')  # raw length, number of code bits
+
+
+def block_code_lengths(block: bytes) -> list:
+    """Code lengths for one block, capped at MAX_CODE_LENGTH
+
+    Args:
+        block (bytes): non-empty block of input
+
+    Returns:
+        list: 256 code lengths
+    """
+    counts = Counter(block)
+    lengths = huffman_code_lengths(counts)
+    if max(lengths.values()) > MAX_CODE_LENGTH:
+        lengths = limited_code_lengths(counts, MAX_CODE_LENGTH)
+    table = [0]*256
+    for b, l in lengths.items():
+        table[b] = l
+    return table
+
+
+def compress_block(block: bytes) -> bytes:
+    """One self-contained block: header, packed code lengths and codes
+
+    Args:
+        block (bytes): non-empty block of input
+
+    Returns:
+        bytes: the encoded block
+    """
+    lengths = block_code_lengths(block)
+    encoded, nbits = canonical_encode(block, lengths)
+    return (_BLOCK_HEADER.pack(len(block), nbits) + pack_lengths(lengths)
+            + encoded)
+
+
+def _read_exact(src, n: int) -> bytes:
+    data = src.read(n)
+    if len(data) != n:
+        raise ValueError('truncated Huffman stream')
+    return data
+
+
+def _read_block(src, raw_length: int, nbits: int) -> bytes:
+    header = _read_exact(src, 1)
+    header += _read_exact(src, 128 if header[0] == 4 else 256)
+    encoded = _read_exact(src, (nbits + 7) >> 3)
+    block = canonical_decode(encoded, nbits, unpack_lengths(header))
+    if len(block) != raw_length:
+        raise ValueError('corrupt Huffman block')
+    return block
+
+
+def decompress_block(data: bytes) -> bytes:
+    """Inverse of compress_block
+
+    Args:
+        data (bytes): one encoded block
+
+    Returns:
+        bytes: the block's input
+    """
+    raw_length, nbits = _BLOCK_HEADER.unpack_from(data)
+    src = memoryview(data)[_BLOCK_HEADER.size:]
+    return _read_block(_BufferReader(src), raw_length, nbits)
+
+
+class _BufferReader:
+    """Minimal file object over a buffer, for _read_block"""
+
+    def __init__(self, buf: memoryview):
+        self.buf = buf
+        self.pos = 0
+
+    def read(self, n: int) -> bytes:
+        data = self.buf[self.pos:self.pos + n]
+        self.pos += len(data)
+        return bytes(data)
+
+
+def compress_stream(src, dst, block_size: int = BLOCK_SIZE) -> tuple:
+    """Compresses a binary file object block by block
+
+    Every block gets its own canonical code, so memory use depends only on
+    block_size, never on the length of the input.
+
+    Args:
+        src: readable binary file object
+        dst: writable binary file object
+        block_size (int): input bytes per block
+
+    Returns:
+        tuple: (bytes read, bytes written)
+    """
+    dst.write(_STREAM_MAGIC)
+    read = 0
+    written = len(_STREAM_MAGIC)
+    while True:
+        block = src.read(block_size)
+        if not block:
+            break
+        out = compress_block(block)
+        dst.write(out)
+        read += len(block)
+        written += len(out)
+    dst.write(_BLOCK_HEADER.pack(0, 0))
+    return read, written + _BLOCK_HEADER.size
+
+
+def decompress_stream(src, dst) -> int:
+    """Inverse of compress_stream
+
+    Args:
+        src: readable binary file object
+        dst: writable binary file object
+
+    Returns:
+        int: bytes written
+    """
+    if src.read(len(_STREAM_MAGIC)) != _STREAM_MAGIC:
+        raise ValueError('not a Huffman stream')
+    written = 0
+    while True:
+        raw_length, nbits = _BLOCK_HEADER.unpack(
+            _read_exact(src, _BLOCK_HEADER.size))
+        if not raw_length:
+            return written
+        block = _read_block(src, raw_length, nbits)
+        dst.write(block)
+        written += len(block)
+
+
+def benchmark_stream(size: int = 1 << 30, block_size: int = BLOCK_SIZE):
+    """compress_stream/decompress_stream throughput on a size-byte file"""
+    import hashlib
+    import os
+    import tempfile
+    import time
+
+    sample = _sample_text(1 << 22)
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [os.path.join(tmp, name) for name in ('in', 'huf', 'out')]
+        digest = hashlib.sha256()
+        with open(paths[0], 'wb') as f:
+            for i in range(0, size, len(sample)):
+                part = sample[:size - i]
+                f.write(part)
+                digest.update(part)
+
+        start = time.perf_counter()
+        with open(paths[0], 'rb') as src, open(paths[1], 'wb') as dst:
+            read, written = compress_stream(src, dst, block_size)
+        compress_time = time.perf_counter() - start
+        start = time.perf_counter()
+        with open(paths[1], 'rb') as src, open(paths[2], 'wb') as dst:
+            decompress_stream(src, dst)
+        decompress_time = time.perf_counter() - start
+
+        check = hashlib.sha256()
+        with open(paths[2], 'rb') as f:
+            for part in iter(lambda: f.read(1 << 20), b''):
+                check.update(part)
+        assert check.digest() == digest.digest()
+    print(f'{read} -> {written} bytes ({written/read:.3f}), '
+          f'compress {read/compress_time/1e6:.1f} MB/s, '
+          f'decompress {read/decompress_time/1e6:.1f} MB/s')
+
+
+_INDEX_TRAILER = struct.Struct('>QQQ4s')  # raw size, block size, blocks
+_INDEX_MAGIC = b'HUFI'
+
+
+def _max_encoded(block_size: int) -> int:
+    # header, widest length table and MAX_CODE_LENGTH bits per byte
+    return _BLOCK_HEADER.size + 257 + (MAX_CODE_LENGTH*block_size + 7)//8
+
+
+def _compress_shared(shm_name: str, slot: int, length: int,
+                     block_size: int) -> int:
+    shm = SharedMemory(name=shm_name)
+    try:
+        start = slot*(block_size + _max_encoded(block_size))
+        block = bytes(shm.buf[start:start + length])
+        out = compress_block(block)
+        start += block_size
+        shm.buf[start:start + len(out)] = out
+        return len(out)
+    finally:
+        shm.close()
+
+
+def compress_parallel(path: str, output: str = None, workers: int = None,
+                      block_size: int = BLOCK_SIZE) -> tuple:
+    """Compresses a file with blocks coded in a pool of worker processes
+
+    Blocks are read into slots of one shared memory segment and every
+    worker writes its encoded block back into the slot, so no block data is
+    pickled. The output is a compress_stream stream (decompress_stream
+    reads it) followed by an index of block offsets, which lets
+    decompress_parallel and read_range decode blocks independently.
+
+    Args:
+        path (str): file to compress
+        output (str): compressed file, path + '.huf' by default
+        workers (int): worker processes, os.cpu_count() by default
+        block_size (int): input bytes per block
+
+    Returns:
+        tuple: (bytes read, bytes written)
+    """
+    output = output or path + '.huf'
+    workers = workers or os.cpu_count()
+    slots = 2*workers
+    slot_size = block_size + _max_encoded(block_size)
+    shm = SharedMemory(create=True, size=slots*slot_size)
+    offsets = []
+    read = 0
+    try:
+        with open(path, 'rb') as src, open(output, 'wb') as dst, \
+                ProcessPoolExecutor(workers) as pool:
+            dst.write(_STREAM_MAGIC)
+            pending = deque()
+            free = list(range(slots))
+            done = False
+            while pending or not done:
+                while free and not done:
+                    slot = free.pop()
+                    start = slot*slot_size
+                    length = src.readinto(shm.buf[start:start + block_size])
+                    if not length:
+                        done = True
+                        free.append(slot)
+                        break
+                    read += length
+                    pending.append((slot, pool.submit(
+                        _compress_shared, shm.name, slot, length, block_size)))
+                if pending:
+                    slot, future = pending.popleft()
+                    start = slot*slot_size + block_size
+                    offsets.append(dst.tell())
+                    dst.write(shm.buf[start:start + future.result()])
+                    free.append(slot)
+            offsets.append(dst.tell())
+            dst.write(_BLOCK_HEADER.pack(0, 0))
+            dst.write(struct.pack(f'>{len(offsets)}Q', *offsets))
+            dst.write(_INDEX_TRAILER.pack(read, block_size, len(offsets) - 1,
+                                          _INDEX_MAGIC))
+            written = dst.tell()
+    finally:
+        shm.close()
+        shm.unlink()
+    return read, written
+
+
+def read_index(path: str) -> tuple:
+    """Block index of a compress_parallel file
+
+    Args:
+        path (str): compressed file
+
+    Returns:
+        tuple: (raw size, block size, list of block offsets ending with the
+               offset just past the last block)
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < _INDEX_TRAILER.size:
+            raise ValueError(f'{path} has no block index')
+        f.seek(-_INDEX_TRAILER.size, os.SEEK_END)
+        raw_size, block_size, count, magic = _INDEX_TRAILER.unpack(
+            f.read(_INDEX_TRAILER.size))
+        if magic != _INDEX_MAGIC:
+            raise ValueError(f'{path} has no block index')
+        f.seek(-_INDEX_TRAILER.size - 8*(count + 1), os.SEEK_END)
+        offsets = list(struct.unpack(f'>{count + 1}Q', f.read(8*(count + 1))))
+    return raw_size, block_size, offsets
+
+
+def read_range(path: str, start: int, length: int) -> bytes:
+    """Random access: decodes only the blocks that cover a byte range
+
+    Args:
+        path (str): file written by compress_parallel
+        start (int): offset in the original input
+        length (int): number of bytes
+
+    Returns:
+        bytes: input bytes start:start+length (shorter at the end of input)
+    """
+    raw_size, block_size, offsets = read_index(path)
+    end = min(start + length, raw_size)
+    if start >= end:
+        return b''
+    first = start//block_size
+    last = (end - 1)//block_size
+    with open(path, 'rb') as f:
+        f.seek(offsets[first])
+        data = f.read(offsets[last + 1] - offsets[first])
+    parts = [decompress_block(data[a - offsets[first]:b - offsets[first]])
+             for a, b in zip(offsets[first:last + 1], offsets[first + 1:last + 2])]
+    skip = start - first*block_size
+    return b''.join(parts)[skip:skip + end - start]
+
+
+def _decompress_into(path: str, output: str, start: int, end: int,
+                     raw_offset: int) -> int:
+    with open(path, 'rb') as f:
+        f.seek(start)
+        block = decompress_block(f.read(end - start))
+    with open(output, 'r+b') as f:
+        f.seek(raw_offset)
+        f.write(block)
+    return len(block)
+
+
+def decompress_parallel(path: str, output: str, workers: int = None) -> int:
+    """Decompresses a compress_parallel file, one block per task
+
+    Workers read their block straight from path and write the result at its
+    offset in output, so only offsets go through the pool.
+
+    Args:
+        path (str): compressed file
+        output (str): file to write
+        workers (int): worker processes, os.cpu_count() by default
+
+    Returns:
+        int: bytes written
+    """
+    raw_size, block_size, offsets = read_index(path)
+    with open(output, 'wb') as f:
+        f.truncate(raw_size)
+    with ProcessPoolExecutor(workers or os.cpu_count()) as pool:
+        futures = [pool.submit(_decompress_into, path, output, a, b,
+                               i*block_size)
+                   for i, (a, b) in enumerate(zip(offsets, offsets[1:]))]
+        written = sum(future.result() for future in futures)
+    if written != raw_size:
+        raise ValueError('corrupt Huffman block index')
+    return written
+
+
+def benchmark_parallel(size: int = 1 << 28, workers: tuple = (1, 2, 4, 8)):
+    """compress_parallel/decompress_parallel throughput per worker count"""
+    import filecmp
+    import tempfile
+    import time
+
+    sample = _sample_text(1 << 22)
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [os.path.join(tmp, name) for name in ('in', 'huf', 'out')]
+        with open(paths[0], 'wb') as f:
+            for i in range(0, size, len(sample)):
+                f.write(sample[:size - i])
+        print(f'{os.cpu_count()} cores')
+        for n in workers:
+            start = time.perf_counter()
+            read, written = compress_parallel(paths[0], paths[1], n)
+            compress_time = time.perf_counter() - start
+            start = time.perf_counter()
+            decompress_parallel(paths[1], paths[2], n)
+            decompress_time = time.perf_counter() - start
+            assert filecmp.cmp(paths[0], paths[2], shallow=False)
+            print(f'{n} workers: compress {read/compress_time/1e6:.1f} MB/s, '
+                  f'decompress {read/decompress_time/1e6:.1f} MB/s')
+
+
+class AdaptiveHuffman:
+    """Adaptive Huffman model over bytes (FGK)
+
+    Needs no probabilities up front: encoder and decoder start from the same
+    empty tree and update it identically after every byte, so a stream is
+    coded in a single pass and no code table is sent. New bytes are sent as
+    the code of the NYT (not yet transmitted) leaf followed by 8 raw bits.
+
+    Nodes are parallel lists indexed by their sibling-property number:
+    weights never decrease with the number, siblings are adjacent and the
+    root has the highest number. top maps every weight to the highest number
+    carrying it, so the leader of a block is found in O(1) and an update
+    costs O(code length).
+    """
+
+    ROOT = 512  # 257 leaves (256 bytes and NYT) and 256 internal nodes
+
+    def __init__(self):
+        size = self.ROOT + 1
+        self.weight = [0]*size
+        self.parent = [-1]*size
+        self.left = [-1]*size  # -1 for leaves
+        self.right = [-1]*size
+        self.symbol = [-1]*size  # byte of a leaf, -1 otherwise
+        self.leaf = [-1]*256  # node number of every byte seen so far
+        self.nyt = self.ROOT
+        self.top = {}
+
+    def code(self, b: int) -> tuple:
+        """Current code of byte b
+
+        Returns:
+            tuple: (code, length), including the escape for unseen bytes
+        """
+        q = self.leaf[b]
+        new = q < 0
+        if new:
+            q = self.nyt
+        parent, right = self.parent, self.right
+        code = length = 0
+        while q != self.ROOT:
+            p = parent[q]
+            if right[p] == q:
+                code |= 1 << length
+            length += 1
+            q = p
+        if new:
+            return code << 8 | b, length + 8
+        return code, length
+
+    def update(self, b: int):
+        """Counts one more occurrence of byte b"""
+        weight, parent, top = self.weight, self.parent, self.top
+        q = self.leaf[b]
+        if q < 0:
+            # NYT becomes an internal node over the new NYT and the new leaf
+            p = self.nyt
+            self.nyt = p - 2
+            self.left[p] = p - 2
+            self.right[p] = p - 1
+            parent[p - 2] = parent[p - 1] = p
+            self.symbol[p - 1] = b
+            self.leaf[b] = p - 1
+            weight[p - 1] = weight[p] = 1
+            top.setdefault(1, p)
+            q = parent[p]
+        while q >= 0:
+            w = weight[q]
+            leader = top[w]
+            p = parent[q]
+            if leader == p:
+                # q's sibling is NYT, so the parent shares q's weight: move q
+                # just below it and increment both
+                if p - 1 != q:
+                    self._swap(q, p - 1)
+                weight[p - 1] = weight[p] = w + 1
+                if weight[p - 2] == w:
+                    top[w] = p - 2
+                else:
+                    del top[w]
+                top.setdefault(w + 1, p)
+                q = parent[p]
+            else:
+                if leader != q:
+                    self._swap(q, leader)
+                    q = leader
+                weight[q] = w + 1
+                if weight[q - 1] == w:
+                    top[w] = q - 1
+                else:
+                    del top[w]
+                top.setdefault(w + 1, q)
+                q = parent[q]
+
+    def _swap(self, a: int, b: int):
+        # exchanges the subtrees numbered a and b (equal weights)
+        left, right, symbol = self.left, self.right, self.symbol
+        left[a], left[b] = left[b], left[a]
+        right[a], right[b] = right[b], right[a]
+        symbol[a], symbol[b] = symbol[b], symbol[a]
+        for x in (a, b):
+            if left[x] >= 0:
+                self.parent[left[x]] = self.parent[right[x]] = x
+            else:
+                self.leaf[symbol[x]] = x
+
+    def encode(self, data: bytes, chunk: int = 1 << 16) -> tuple:
+        """Encodes data and updates the model
+
+        Consecutive calls continue the same stream; a decoder must be given
+        the pieces in the same order.
+
+        Args:
+            data (bytes): next piece of the stream
+            chunk (int): input bytes packed per step
+
+        Returns:
+            tuple: (encoded bytes, number of valid bits)
+        """
+        code, update = self.code, self.update
+        out = bytearray()
+        rest = ''
+        for i in range(0, len(data), chunk):
+            bits = [rest]
+            for b in data[i:i + chunk]:
+                c, l = code(b)
+                bits.append(format(c, f'0{l}b'))
+                update(b)
+            rest = _pack_bits(out, ''.join(bits))
+        return _finish_bits(out, rest)
+
+    def decode(self, encoded: bytes, nbits: int, chunk: int = 1 << 13) -> bytes:
+        """Decodes one piece produced by encode and updates the model
+
+        Args:
+            encoded (bytes): encoded piece
+            nbits (int): number of valid bits in encoded
+            chunk (int): encoded bytes expanded to a bit string per step
+
+        Returns:
+            bytes: decoded piece
+        """
+        left, right, update = self.left, self.right, self.update
+        root = self.ROOT
+        out = bytearray()
+        bits = ''
+        pos = 0  # into bits
+        done = 0  # bits of encoded already moved into bits
+        while done < nbits or pos < len(bits):
+            # longest code is 256 tree bits plus the 8-bit escape
+            while len(bits) - pos < 300 and done < nbits:
+                piece = encoded[done >> 3:(done >> 3) + chunk]
+                more = format(int.from_bytes(piece, 'big'), f'0{8*len(piece)}b')
+                more = more[:nbits - done]
+                bits = bits[pos:] + more
+                pos = 0
+                done += len(more)
+            q = root
+            try:
+                while left[q] >= 0:
+                    q = right[q] if bits[pos] == '1' else left[q]
+                    pos += 1
+            except IndexError:
+                raise ValueError(
+                    'encoded data ends in the middle of a code') from None
+            if q == self.nyt:
+                b = int(bits[pos:pos + 8], 2)
+                pos += 8
+            else:
+                b = self.symbol[q]
+            if pos > len(bits):
+                raise ValueError('encoded data ends in the middle of a code')
+            out.append(b)
+            update(b)
+        return bytes(out)
+
+
+def benchmark_adaptive(size: int = 1 << 20):
+    """Compression ratio and throughput of AdaptiveHuffman against the static
+    block coder (compress_block) on the same inputs"""
+    import random
+    import time
+
+    rnd = random.Random(0)
+    inputs = {
+        'text': _sample_text(size),
+        'skewed': bytes(rnd.choices(range(256), [0.9**i for i in range(256)],
+                                    k=size)),
+        'random': bytes(rnd.choices(range(256), k=size)),
+    }
+    for name, data in inputs.items():
+        start = time.perf_counter()
+        static = compress_block(data)
+        encode_time = time.perf_counter() - start
+        start = time.perf_counter()
+        assert decompress_block(static) == data
+        decode_time = time.perf_counter() - start
+        print(f'{name} static: ratio {len(static)/size:.4f}, '
+              f'encode {size/encode_time/1e6:.2f} MB/s, '
+              f'decode {size/decode_time/1e6:.2f} MB/s')
+
+        start = time.perf_counter()
+        encoded, nbits = AdaptiveHuffman().encode(data)
+        encode_time = time.perf_counter() - start
+        start = time.perf_counter()
+        assert AdaptiveHuffman().decode(encoded, nbits) == data
+        decode_time = time.perf_counter() - start
+        print(f'{name} adaptive: ratio {len(encoded)/size:.4f}, '
+              f'encode {size/encode_time/1e6:.2f} MB/s, '
+              f'decode {size/decode_time/1e6:.2f} MB/s')
+
+
+def main(argv: list = None):
+    """Command line interface: python -m huffman compress|decompress|benchmark"""
+    import argparse
+
+    parser = argparse.ArgumentParser(prog='python -m huffman')
+    commands = parser.add_subparsers(dest='command', required=True)
+    for name in ('compress', 'decompress'):
+        command = commands.add_parser(name)
+        command.add_argument('input', nargs='?', default='-',
+                             help="file to read, '-' for stdin")
+        command.add_argument('output', nargs='?', default='-',
+                             help="file to write, '-' for stdout")
+        command.add_argument('--workers', type=int, default=0,
+                             help='code blocks in parallel (files only)')
+    commands.choices['compress'].add_argument(
+        '--block-size', type=int, default=BLOCK_SIZE)
+    command = commands.add_parser('benchmark')
+    command.add_argument('--size', type=int, default=1 << 30)
+    command.add_argument('--parallel', action='store_true')
+    args = parser.parse_args(argv)
+
+    if args.command == 'benchmark':
+        if args.parallel:
+            benchmark_parallel(args.size)
+        else:
+            benchmark_stream(args.size)
+        return
+    if args.workers:
+        if '-' in (args.input, args.output):
+            parser.error('--workers needs input and output files')
+        if args.command == 'compress':
+            compress_parallel(args.input, args.output, args.workers,
+                              args.block_size)
+            return
+        try:
+            read_index(args.input)
+        except ValueError:
+            pass  # written by compress_stream: decode it sequentially below
+        else:
+            decompress_parallel(args.input, args.output, args.workers)
+            return
+    src = sys.stdin.buffer if args.input == '-' else open(args.input, 'rb')
+    dst = sys.stdout.buffer if args.output == '-' else open(args.output, 'wb')
+    try:
+        if args.command == 'compress':
+            compress_stream(src, dst, args.block_size)
+        else:
+            decompress_stream(src, dst)
+    finally:
+        if src is not sys.stdin.buffer:
+            src.close()
+        if dst is not sys.stdout.buffer:
+            dst.close()
+        else:
+            dst.flush()
+
+
+def _sample_text(size: int, seed: int = 0) -> bytes:
+    """size bytes of text-like benchmark input: short words over skewed letters"""
+    import random
+
+    rnd = random.Random(seed)
+    words = [bytes(rnd.choices(b'etaoinshrdlucmfwypvbgkqjxz', k=rnd.randint(1, 9)))
+             for _ in range(5000)]
+    return b' '.join(rnd.choices(words, k=size//5 + 1))[:size]
+
+
+def benchmark_codec(size: int = 1 << 22, repeat: int = 3):
+    """Throughput of the bit-packed codec against the '0'/'1' string codec"""
+    import time
+
+    data = _sample_text(size)
+    tree = Huffman_tree(byte_probabilities(data))
+
+    def best(f):
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = f()
+            times.append(time.perf_counter() - start)
+        return result, len(data)/min(times)/1e6
+
+    (encoded, nbits), enc_speed = best(lambda: encode_bytes(data, tree))
+    decoded, dec_speed = best(lambda: decode_bytes(encoded, nbits, tree))
+    assert decoded == data
+    print(f'{len(data)} bytes -> {len(encoded)} bytes')
+    print(f'packed encode: {enc_speed:.1f} MB/s, decode: {dec_speed:.1f} MB/s')
+
+    header = pack_lengths(byte_code_lengths(code_lengths(tree)))
+    start = time.perf_counter()
+    table = decode_table(*canonical_code_table(unpack_lengths(header)))
+    setup = time.perf_counter() - start
+    encoded, nbits = canonical_encode(data, unpack_lengths(header))
+    assert canonical_decode(encoded, nbits, unpack_lengths(header)) == data
+    print(f'canonical: {len(header)} byte header, decoder setup '
+          f'{1000*setup:.1f} ms for {len(table)} entries')
+
+    text = data.decode('latin-1')
+    coding = calculate_codes(tree, '', {})
+    old, enc_speed = best(lambda: Huffman_encode(text, coding))
+    _, dec_speed = best(lambda: Huffman_decode(old, tree))
+    print(f'string encode: {enc_speed:.1f} MB/s, decode: {dec_speed:.1f} MB/s, '
+          f'{len(old)} bytes of output')
+
+
+def benchmark_builders(sizes: tuple = (256, 4096, 1 << 16, 1 << 20),
+                       tree_limit: int = 4096):
+    """Time of huffman_code_lengths against Huffman_tree per alphabet size"""
+    import random
+    import time
+
+    rnd = random.Random(0)
+    for n in sizes:
+        # Zipf-like word frequencies
+        probs = {f'w{i}': 1/(i + 1) + rnd.random()*1e-6 for i in range(n)}
+        start = time.perf_counter()
+        lengths = huffman_code_lengths(probs)
+        fast = time.perf_counter() - start
+        line = f'{n} symbols: two-queue {1000*fast:.1f} ms'
+        if n <= tree_limit:
+            start = time.perf_counter()
+            tree = Huffman_tree(probs)
+            slow = time.perf_counter() - start
+            total = sum(probs.values())
+            cost = sum(probs[s]*l for s, l in lengths.items())/total
+            tree_lengths = code_lengths(tree)
+            tree_cost = sum(probs[s]*l for s, l in tree_lengths.items())/total
+            line += (f', Huffman_tree {1000*slow:.1f} ms; '
+                     f'average length {cost:.4f} vs {tree_cost:.4f}')
+        print(line)
+
+
 
 ######testing
 
-symbols_with_probs={'A':0.13,'B':0.21,'C':0.39,'D':0.19,'E':0.08}
-print('problem: ', symbols_with_probs)
-tree=Huffman_tree(symbols_with_probs)
-huffman_code = calculate_codes(tree)
-print('encoding:',huffman_code)
+def demo():
+    symbols_with_probs={'A':0.13,'B':0.21,'C':0.39,'D':0.19,'E':0.08}
+    print('problem: ', symbols_with_probs)
+    tree=Huffman_tree(symbols_with_probs)
+    huffman_code = calculate_codes(tree)
+    print('encoding:',huffman_code)
 
-data = 'DEBADE'
-print('original text: ',data)
+    data = 'DEBADE'
+    print('original text: ',data)
 
-print('-------ENCODE--------')
-enc=Huffman_encode(data,huffman_code)
-print('data encoded: ',enc)
+    print('-------ENCODE--------')
+    enc=Huffman_encode(data,huffman_code)
+    print('data encoded: ',enc)
 
-print('-------DECODE--------')
-print('data decoded back: ',Huffman_decode(enc,tree))
+    print('-------DECODE--------')
+    print('data decoded back: ',Huffman_decode(enc,tree))
 
 """ # ispravan izlaz
 problem:  {'A': 0.13, 'B': 0.21, 'C': 0.39, 'D': 0.19, 'E': 0.08}
@@ -194,4 +1354,13 @@ original text:  DEBADE
 data encoded:  000101001100010
 -------DECODE--------
 data decoded back:  DEBADE
-# """
\ No newline at end of file
+# """
+
+if __name__ == '__main__':
+    if sys.argv[1:]:
+        main()
+    else:
+        demo()
+        benchmark_codec()
+        benchmark_builders()
+        benchmark_adaptive()